@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Benchmark the page generators on seeded synthetic datasets
+Times the load, group, render, write and sitemap stages of generate_all_pages.py and generate_pages.py
+and appends the results to a JSON file so runs can be compared across commits
+"""
+
+import argparse
+import contextlib
+import csv
+import gc
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from synthetic_data import write_synthetic_csv
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+GENERATORS = ['generate_all_pages', 'generate_pages']
+RESULTS_PATH = 'benchmark-results.json'
+STAGES = ['load', 'group', 'render', 'write', 'sitemap']
+
+# Inputs the generators read relative to the working directory
+SUPPORT_FILES = ['templates', 'zip_centroids.csv']
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where unsupported"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_all_pages(csv_path, timings):
+    """Run generate_all_pages stage by stage, serially; returns (pages, bytes written)"""
+    from generate_all_pages import (build_nav_states, create_city_page, create_state_page, group_store_data,
+                                    plan_city_pages, plan_state_pages, write_page)
+    from generate_complete_sitemap import generate_complete_sitemap
+    from slugs import SlugRegistry
+    from store_data import load_stores
+
+    start = time.perf_counter()
+    stores = load_stores(csv_path, use_cache=False)
+    timings['load'] = time.perf_counter() - start
+
+    # Grouping includes the slug registry and planning (input hashing) of every page
+    start = time.perf_counter()
+    stores_by_state, stores_by_city, states_data = group_store_data(stores)
+    state_cities = {state: data['cities'] for state, data in states_data.items()}
+    slugs = SlugRegistry(state_cities)
+    nav_states = build_nav_states(stores_by_state, slugs)
+    state_jobs, _ = plan_state_pages(stores_by_state, states_data, nav_states, slugs, {}, {})
+    city_jobs, _ = plan_city_pages(stores_by_city, nav_states, slugs, {}, {})
+    timings['group'] = time.perf_counter() - start
+
+    render_time = write_time = 0.0
+    bytes_written = 0
+    for kind, out_path, args in state_jobs + city_jobs:
+        start = time.perf_counter()
+        page = create_state_page(*args) if kind == 'state' else create_city_page(*args)
+        render_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        bytes_written += write_page(out_path, [page])
+        write_time += time.perf_counter() - start
+    timings['render'] = render_time
+    timings['write'] = write_time
+
+    start = time.perf_counter()
+    generate_complete_sitemap(state_cities=state_cities, slugs=slugs)
+    timings['sitemap'] = time.perf_counter() - start
+    bytes_written += os.path.getsize('sitemap.xml')
+
+    return len(state_jobs) + len(city_jobs), bytes_written
+
+def run_pages(csv_path, timings):
+    """Run generate_pages stage by stage; returns (pages, bytes written)"""
+    from generate_complete_sitemap import generate_complete_sitemap
+    from generate_pages import iter_pages, load_frame, prepare_pages, write_generated_page
+
+    start = time.perf_counter()
+    df = load_frame(csv_path, use_cache=False)
+    timings['load'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    context = prepare_pages(df)
+    timings['group'] = time.perf_counter() - start
+
+    render_time = write_time = 0.0
+    bytes_written = pages = 0
+    page_iter = iter_pages(context)
+    while True:
+        start = time.perf_counter()
+        item = next(page_iter, None)
+        render_time += time.perf_counter() - start
+        if item is None:
+            break
+        page_dir, page, _ = item
+
+        start = time.perf_counter()
+        bytes_written += write_generated_page(page_dir, page)
+        write_time += time.perf_counter() - start
+        pages += 1
+    timings['render'] = render_time
+    timings['write'] = write_time
+
+    start = time.perf_counter()
+    state_cities = {state: set(cities) for state, cities in context['states_data'].items()}
+    generate_complete_sitemap(state_cities=state_cities, slugs=context['slugs'])
+    timings['sitemap'] = time.perf_counter() - start
+    bytes_written += os.path.getsize('sitemap.xml')
+
+    return pages, bytes_written
+
+RUNNERS = {
+    'generate_all_pages': run_all_pages,
+    'generate_pages': run_pages
+}
+
+def run_one(generator, csv_path):
+    """Benchmark one generator in the current directory and return its result record"""
+    timings = {}
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        pages, bytes_written = RUNNERS[generator](csv_path, timings)
+
+    build_time = timings['render'] + timings['write']
+    return {
+        'generator': generator,
+        'pages': pages,
+        'stages': timings,
+        'total_seconds': sum(timings.values()),
+        'pages_per_sec': pages / build_time if build_time else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'bytes_written': bytes_written
+    }
+
+def run_isolated(generator, csv_path):
+    """Run one benchmark in a fresh process and scratch directory so peak RSS and output are its own"""
+    with tempfile.TemporaryDirectory(prefix='bench-') as work_dir:
+        for name in SUPPORT_FILES:
+            src = os.path.join(REPO_DIR, name)
+            if os.path.isdir(src):
+                shutil.copytree(src, os.path.join(work_dir, name))
+            else:
+                shutil.copy(src, work_dir)
+
+        output = subprocess.run(
+            [sys.executable, os.path.join(REPO_DIR, 'benchmark.py'), '--run-one', generator, csv_path],
+            cwd=work_dir, capture_output=True, text=True, check=True
+        ).stdout
+    return json.loads(output.splitlines()[-1])
+
+def legacy_features(row):
+    """Build a row's features list the way the per-store dicts did, before feature_mask"""
+    from store_data import FEATURE_NAMES, get_price_level_text
+
+    features = [get_price_level_text(row['pricing'])]
+    features.extend(name for field, name in FEATURE_NAMES.items()
+                    if row.get(field, '').strip().lower() == 'yes')
+    return features
+
+def legacy_record(row):
+    """Build the per-store dict used before Store records, for memory comparison"""
+    from store_data import ATTRIBUTE_COLUMNS, clean_state, get_feature_mask, parse_reviews
+
+    state = clean_state(row['State'] or '')
+    city = (row['City'] or '').strip()
+    if not state or not city:
+        return None
+    return {
+        'name': row['Business Name'].strip(),
+        'address': row['Address'].strip(),
+        'city': city,
+        'state': state,
+        'phone': (row.get('Phone') or '').strip(),
+        'website': (row.get('Site') or '').strip(),
+        'reviews': parse_reviews(row.get('Number of Reviews')),
+        'photo': (row.get('Photo') or '').strip(),
+        'attributes': {col: (row.get(col) or '').strip() for col in ATTRIBUTE_COLUMNS},
+        'features': legacy_features(row),
+        'feature_mask': get_feature_mask(row)
+    }
+
+def measure_records(csv_path, parse):
+    """Bytes retained by the records parse builds from every CSV row"""
+    gc.collect()
+    tracemalloc.start()
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        records = [record for record in map(parse, csv.DictReader(f)) if record is not None]
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(records), retained
+
+def benchmark_record_memory(n_stores, seed=42):
+    """Compare bytes per store for the old dict records and Store records"""
+    from store_data import parse_row
+
+    with tempfile.TemporaryDirectory(prefix='bench-data-') as data_dir:
+        csv_path = os.path.join(data_dir, 'stores.csv')
+        print(f"Writing {n_stores:,} synthetic stores...")
+        write_synthetic_csv(csv_path, n_stores, seed)
+
+        count, dict_bytes = measure_records(csv_path, legacy_record)
+        _, store_bytes = measure_records(csv_path, parse_row)
+
+    print(f"Record memory for {count:,} stores (tracemalloc, including strings):")
+    print(f"  dict + features list: {dict_bytes / count:8.0f} bytes/store ({dict_bytes / (1024 * 1024):.1f} MB)")
+    print(f"  Store record:         {store_bytes / count:8.0f} bytes/store ({store_bytes / (1024 * 1024):.1f} MB)")
+    print(f"  Reduction:            {1 - store_bytes / dict_bytes:8.1%}")
+
+def git_commit():
+    """Short hash of the checked-out commit, or None outside a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(results):
+    """Print one row per generator and dataset size"""
+    header = f"{'generator':<20} {'stores':>9} {'pages':>7}" + ''.join(f" {stage:>8}" for stage in STAGES)
+    header += f" {'pages/s':>9} {'peak MB':>8} {'MB out':>8}"
+    print(header)
+    for result in results:
+        row = f"{result['generator']:<20} {result['stores']:>9,} {result['pages']:>7,}"
+        row += ''.join(f" {result['stages'][stage]:>7.2f}s" for stage in STAGES)
+        pages_per_sec = result['pages_per_sec'] or 0
+        peak = result['peak_rss_mb']
+        row += f" {pages_per_sec:>9,.0f} {peak if peak is not None else float('nan'):>8.1f}"
+        row += f" {result['bytes_written'] / (1024 * 1024):>8.1f}"
+        print(row)
+
+def save_results(run, path=RESULTS_PATH):
+    """Append this run to the results file"""
+    runs = []
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            runs = json.load(f)
+    runs.append(run)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(runs, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the page generators on synthetic datasets")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, metavar='STORES',
+                        help="synthetic dataset sizes (default: 10000 100000 1000000)")
+    parser.add_argument('--generators', nargs='+', choices=GENERATORS, default=GENERATORS,
+                        help="generators to benchmark (default: both)")
+    parser.add_argument('--seed', type=int, default=42, help="synthetic data seed (default: 42)")
+    parser.add_argument('--output', default=RESULTS_PATH,
+                        help=f"JSON file the run is appended to (default: {RESULTS_PATH})")
+    parser.add_argument('--record-memory', type=int, metavar='STORES',
+                        help="compare bytes per store record on STORES synthetic stores instead of running the generators")
+    parser.add_argument('--run-one', nargs=2, metavar=('GENERATOR', 'CSV'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Worker mode: benchmark one generator in the current directory and print its record
+    if args.run_one:
+        generator, csv_path = args.run_one
+        print(json.dumps(run_one(generator, csv_path)))
+        return
+
+    if args.record_memory:
+        benchmark_record_memory(args.record_memory, args.seed)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='bench-data-') as data_dir:
+        for size in args.sizes:
+            csv_path = os.path.join(data_dir, f'stores-{size}.csv')
+            print(f"Writing {size:,} synthetic stores...")
+            write_synthetic_csv(csv_path, size, args.seed)
+
+            for generator in args.generators:
+                print(f"Benchmarking {generator} on {size:,} stores...")
+                result = run_isolated(generator, csv_path)
+                result['stores'] = size
+                results.append(result)
+
+            os.remove(csv_path)
+
+    print()
+    print_results(results)
+
+    save_results({
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'seed': args.seed,
+        'results': results
+    }, args.output)
+    print(f"\nResults appended to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Build every site artifact in one pass
+Loads consignment_stores.csv once and renders state pages, city pages, sitemaps,
+state_data.json, the homepage update, store data shards and the store snapshot from the same in-memory data
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from build_graph import (HOMEPAGE, HTML_SITEMAP, STATE_DATA, XML_SITEMAP, affected_outputs, build_dependency_graph,
+                         city_page_path, graph_outputs, load_graph, missing_outputs, print_rebuild_plan, save_graph,
+                         state_page_path)
+from build_manifest import file_digest, load_manifest, modified_outputs, save_manifest, stamp_outputs
+from build_metrics import METRICS_PATH, BuildMetrics
+from generate_all_pages import build_nav_states, group_store_data, plan_city_pages, plan_state_pages, run_page_jobs
+from generate_complete_sitemap import generate_complete_sitemap
+from generate_html_sitemap import generate_html_sitemap
+from get_state_counts import get_state_counts, save_state_data
+from precompress import default_targets, precompress
+from slugs import SlugRegistry
+from store_cards import write_homepage
+from store_shards import MONOLITH_PATH, SHARD_DIR, write_monolith, write_store_shards
+from store_data import CSV_PATH, load_stores, store_to_row
+from store_ranking import ReviewRanking
+from store_snapshot import SNAPSHOT_PATH, write_snapshot
+
+def build(force=False, jobs=1, compress=False, quiet=False, metrics_path=METRICS_PATH,
+          city_shards=False, monolith=False, dry_run=False):
+    """Load the dataset once and write every artifact from it
+
+    When the dependency graph saved by the last build is current, only the
+    outputs the data changes affect are regenerated; dry_run lists them
+    without writing anything.
+    """
+    metrics = BuildMetrics(quiet=quiet)
+
+    print("Loading store data...")
+    stores = metrics.run('load', load_stores)
+    # One review ranking serves every featured and top-N section below
+    ranking = metrics.run('ranking', ReviewRanking, stores)
+    stores_by_state, stores_by_city, states_data = metrics.run('group', group_store_data, stores, ranking)
+    state_cities = {state: data['cities'] for state, data in states_data.items()}
+    slugs = SlugRegistry(state_cities)
+    slugs.report_collisions()
+    print(f"Loaded {len(stores)} stores in {len(stores_by_state)} states and {len(stores_by_city)} cities")
+
+    graph = metrics.run('dependency graph', build_dependency_graph, stores, slugs, ranking)
+    previous_graph = None if force else load_graph()
+    # Pages whose inputs hash matches the last build are left untouched
+    previous_manifest = {} if force else load_manifest()
+    changed, affected = [], None
+    if previous_graph is not None:
+        changed, affected = affected_outputs(previous_graph, graph)
+        # Outputs deleted or rewritten since the last build are rebuilt even when their stores are unchanged
+        affected |= missing_outputs(graph)
+        affected |= modified_outputs(previous_manifest) & graph_outputs(graph)
+
+    if dry_run:
+        print_rebuild_plan(changed, affected)
+        return
+    if affected is not None:
+        print(f"{len(changed)} stores changed since last build, {len(affected)} outputs affected")
+
+    def wanted(output):
+        return affected is None or output in affected
+
+    # Pages outside the affected set are not planned, so they keep their manifest entries
+    manifest = {} if affected is None else dict(previous_manifest)
+    nav_states = build_nav_states(stores_by_state, slugs)
+    state_pages = {state: state_stores for state, state_stores in stores_by_state.items()
+                   if wanted(state_page_path(slugs, state))}
+    city_pages = {}
+    for (state_name, city_name), city_stores in stores_by_city.items():
+        if wanted(city_page_path(slugs, state_name, city_name)):
+            city_pages[state_name, city_name] = city_stores
+
+    executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    try:
+        print("Generating state pages...")
+        state_jobs, unchanged = plan_state_pages(state_pages, states_data, nav_states, slugs, previous_manifest, manifest)
+        written = metrics.run('state pages', run_page_jobs, state_jobs, metrics, 'state pages', executor, jobs)
+
+        print("Generating city pages...")
+        city_jobs, city_unchanged = plan_city_pages(city_pages, nav_states, slugs, previous_manifest, manifest)
+        written += metrics.run('city pages', run_page_jobs, city_jobs, metrics, 'city pages', executor, jobs)
+        unchanged += city_unchanged
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    stamp_outputs(manifest)
+    save_manifest(manifest)
+    metrics.unchanged = unchanged
+    print(f"Wrote {written} pages, {unchanged} unchanged since last build")
+
+    # Site-wide pages come before sitemap.xml so their lastmod reflects this build
+    if wanted(HTML_SITEMAP):
+        metrics.run('sitemap/index.html', generate_html_sitemap, state_cities, slugs)
+
+    if wanted(STATE_DATA) or wanted(HOMEPAGE):
+        sorted_states, top_states_data = metrics.run('state counts', get_state_counts, stores, ranking)
+    if wanted(STATE_DATA):
+        metrics.run('state_data.json', save_state_data, sorted_states, top_states_data)
+
+    if wanted(HOMEPAGE):
+        state_counts = dict(sorted_states)
+        featured_stores = [store_to_row(store, feature_mask=True) for store in ranking.top(6)]
+        metrics.run('homepage', write_homepage, featured_stores, state_counts)
+
+    if affected is None or any(output.startswith(SHARD_DIR) for output in affected):
+        written, unchanged = metrics.run('store shards', write_store_shards, stores, slugs, per_city=city_shards)
+        print(f"Wrote {written} store shards, {unchanged} unchanged")
+        if monolith:
+            metrics.run(MONOLITH_PATH, write_monolith, stores)
+
+    # Columnar snapshot for tools that only need a few states' stores
+    if wanted(SNAPSHOT_PATH):
+        metrics.run('store snapshot', write_snapshot, stores, source_digest=bytes.fromhex(file_digest(CSV_PATH)))
+
+    if wanted(XML_SITEMAP):
+        metrics.run('sitemap.xml', generate_complete_sitemap, state_cities=state_cities, slugs=slugs)
+
+    if compress:
+        print("Precompressing pages...")
+        metrics.run('precompress', precompress, default_targets(), jobs)
+
+    save_graph(graph)
+
+    metrics.print_table()
+    metrics.write_json(metrics_path)
+    print(f"Build metrics written to {metrics_path}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build all pages, sitemaps and state data from one load of the dataset")
+    parser.add_argument('--force', action='store_true',
+                        help="re-render every page even if its inputs are unchanged")
+    parser.add_argument('--jobs', type=int, default=1, metavar='N',
+                        help="render pages across N worker processes (default: 1)")
+    parser.add_argument('--precompress', action='store_true',
+                        help="write .gz/.br siblings for every page and sitemap after the build")
+    parser.add_argument('--city-shards', action='store_true',
+                        help="also write one store data shard per city")
+    parser.add_argument('--monolith', action='store_true',
+                        help=f"also write every store to {MONOLITH_PATH}")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="list the outputs that changed data would rebuild, without writing anything")
+    parser.add_argument('--quiet', action='store_true',
+                        help="no per-page progress output, only the final summary")
+    parser.add_argument('--metrics', default=METRICS_PATH, metavar='PATH',
+                        help=f"write the build metrics summary as JSON to PATH (default: {METRICS_PATH})")
+    args = parser.parse_args(argv)
+
+    build(force=args.force, jobs=args.jobs, compress=args.precompress, quiet=args.quiet, metrics_path=args.metrics,
+          city_shards=args.city_shards, monolith=args.monolith, dry_run=args.dry_run)
+
+if __name__ == '__main__':
+    main()
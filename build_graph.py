@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Dependency graph from store IDs to the pages and artifacts built from them
+Lets build.py regenerate only the outputs a data edit affects, or list them with --dry-run
+"""
+
+import json
+import os
+from collections import defaultdict
+
+from build_manifest import file_digest, hash_inputs
+from store_data import CACHE_DIR
+from store_ranking import ReviewRanking
+from store_shards import INDEX_PATH, SHARD_DIR
+from store_snapshot import SNAPSHOT_PATH
+
+GRAPH_PATH = os.path.join(CACHE_DIR, 'build-graph.json')
+
+# Bump when the edges below change so an old graph triggers a full build
+GRAPH_VERSION = 1
+
+# Code that decides what the outputs contain; editing any of it invalidates the graph
+BUILD_SOURCES = [
+    'build.py', 'build_graph.py', 'generate_all_pages.py', 'generate_complete_sitemap.py',
+    'generate_html_sitemap.py', 'generate_pages.py', 'get_state_counts.py', 'slugs.py', 'store_cards.py',
+    'store_data.py', 'store_ranking.py', 'store_shards.py', 'store_snapshot.py'
+]
+
+# Site-wide artifacts
+HOMEPAGE = 'index.html'
+STATE_DATA = 'state_data.json'
+HTML_SITEMAP = 'sitemap/index.html'
+XML_SITEMAP = 'sitemap.xml'
+
+# Stores featured on a state page, per state in state_data.json, and on the homepage
+STATE_FEATURED = 3
+STATE_DATA_TOP = 3
+HOMEPAGE_FEATURED = 6
+
+def state_page_path(slugs, state):
+    """Output path of a state page, as used in the pages manifest"""
+    return f"{slugs.state_slug(state)}/index.html"
+
+def city_page_path(slugs, state, city):
+    """Output path of a city page, as used in the pages manifest"""
+    return f"{slugs.state_slug(state)}/{slugs.city_slug(state, city)}/index.html"
+
+def page_state(page):
+    """State page path for a city page path"""
+    return page.split('/', 1)[0] + '/index.html'
+
+def build_dependency_graph(stores, slugs, ranking=None):
+    """Return {store ID: entry} for every store
+
+    An entry holds a digest of the store's rows (an ID can repeat when the
+    CSV has duplicate rows), the city pages they are listed on, and every
+    output that renders the store's fields: its city page and state data
+    shard, plus its state page, state_data.json and the homepage when it is
+    among their featured stores.
+    """
+    if ranking is None:
+        ranking = ReviewRanking(stores)
+    rows = defaultdict(list)
+    outputs = defaultdict(set)
+    for store in stores:
+        store_id = store.store_id
+        rows[store_id].append(store)
+        outputs[store_id].add(city_page_path(slugs, store.state, store.city))
+        outputs[store_id].add(os.path.join(SHARD_DIR, f"{slugs.state_slug(store.state)}.json"))
+
+    for state in ranking.states:
+        for store in ranking.state_top(state, STATE_FEATURED):
+            outputs[store.store_id].add(state_page_path(slugs, state))
+        for store in ranking.state_top(state, STATE_DATA_TOP):
+            outputs[store.store_id].add(STATE_DATA)
+    for store in ranking.top(HOMEPAGE_FEATURED):
+        outputs[store.store_id].add(HOMEPAGE)
+
+    return {
+        store_id: {
+            'digest': hash_inputs(store_rows),
+            'pages': sorted(city_page_path(slugs, store.state, store.city) for store in store_rows),
+            'outputs': sorted(outputs[store_id])
+        }
+        for store_id, store_rows in rows.items()
+    }
+
+def graph_pages(graph):
+    """Every city page in a graph"""
+    return {page for entry in graph.values() for page in entry['pages']}
+
+def affected_outputs(previous_graph, graph):
+    """Return (changed store IDs, outputs to rebuild) going from previous_graph to graph
+
+    A changed store invalidates its outputs under both graphs, which covers
+    it entering or leaving a featured section; an unchanged store only
+    invalidates the outputs it was added to or dropped from. Stores that
+    are added, removed or move city also change store counts on state
+    pages, state_data.json and the homepage. A different set of city pages
+    changes the sitemaps, and a different set of states changes the
+    navigation on every page.
+    """
+    changed = []
+    affected = set()
+    for store_id in previous_graph.keys() | graph.keys():
+        old = previous_graph.get(store_id)
+        new = graph.get(store_id)
+        if old == new:
+            continue
+
+        old_pages = old['pages'] if old else []
+        new_pages = new['pages'] if new else []
+        if old and new and old['digest'] == new['digest']:
+            # Same rows, but the store entered or left a featured section or its city slug moved
+            affected.update(set(old['outputs']) ^ set(new['outputs']))
+        else:
+            changed.append(store_id)
+            for entry in (old, new):
+                if entry is not None:
+                    affected.update(entry['outputs'])
+        if old_pages != new_pages:
+            affected.update(page_state(page) for page in old_pages + new_pages)
+            affected.update([HOMEPAGE, STATE_DATA])
+
+    old_cities = graph_pages(previous_graph)
+    new_cities = graph_pages(graph)
+    if old_cities != new_cities:
+        affected.update([HTML_SITEMAP, XML_SITEMAP])
+
+    new_states = {page_state(page) for page in new_cities}
+    if {page_state(page) for page in old_cities} != new_states:
+        affected.update(new_cities | new_states)
+
+    # Every page's lastmod is listed in sitemap.xml
+    if any(output.endswith('index.html') for output in affected):
+        affected.add(XML_SITEMAP)
+    if changed:
+        affected.add(SNAPSHOT_PATH)
+
+    return sorted(changed), affected
+
+def graph_outputs(graph):
+    """Every output a build from graph writes
+
+    The homepage is left out, as it is patched in place rather than written
+    from scratch.
+    """
+    outputs = {output for entry in graph.values() for output in entry['outputs']}
+    cities = graph_pages(graph)
+    outputs.update(cities)
+    outputs.update(page_state(page) for page in cities)
+    outputs.update([STATE_DATA, HTML_SITEMAP, XML_SITEMAP, SNAPSHOT_PATH, INDEX_PATH])
+    outputs.discard(HOMEPAGE)
+    return outputs
+
+def missing_outputs(graph):
+    """Outputs a build from graph writes that are not on disk"""
+    return {output for output in graph_outputs(graph) if not os.path.exists(output)}
+
+def sources_digest():
+    """Digest of BUILD_SOURCES that exist in the working directory"""
+    return hash_inputs([file_digest(path) for path in BUILD_SOURCES if os.path.exists(path)])
+
+def load_graph(path=GRAPH_PATH):
+    """Return the graph saved by the last build, or None if there is none or it is out of date"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        saved = json.load(f)
+    if saved.get('version') != GRAPH_VERSION or saved.get('sources') != sources_digest():
+        return None
+    return saved['stores']
+
+def save_graph(graph, path=GRAPH_PATH):
+    """Save the graph for the next build"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'version': GRAPH_VERSION, 'sources': sources_digest(), 'stores': graph}, f,
+                  ensure_ascii=False, separators=(',', ':'))
+
+def print_rebuild_plan(changed, affected):
+    """Print the outputs a build would regenerate"""
+    if affected is None:
+        print("No usable dependency graph from a previous build; every output would be rebuilt")
+        return
+    print(f"{len(changed)} stores changed; would rebuild {len(affected)} outputs:")
+    for output in sorted(affected):
+        print(f"  {output}")
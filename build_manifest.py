@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Build manifest for incremental page generation
+Records a hash of each output file's inputs and the size and mtime it was written with, so unchanged pages
+are not re-rendered, and each page's content hash so its lastmod only moves when the page changes
+"""
+
+import hashlib
+import json
+import os
+
+from store_data import CACHE_DIR
+
+MANIFEST_PATH = os.path.join(CACHE_DIR, 'pages-manifest.json')
+LASTMOD_PATH = os.path.join(CACHE_DIR, 'page-lastmod.json')
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of a file's contents"""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def hash_inputs(*parts):
+    """Hash JSON-serializable page inputs into a stable hex digest"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=sorted)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def load_manifest(path=MANIFEST_PATH):
+    """Load the output path -> inputs hash mapping from the last build"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    """Write the manifest atomically so an interrupted build never leaves it half-written"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def matches_file(record, out_path):
+    """True if out_path exists with the size and mtime a manifest record saw after writing it"""
+    try:
+        stat = os.stat(out_path)
+    except FileNotFoundError:
+        return False
+    return record.get('size') == stat.st_size and record.get('mtime_ns') == stat.st_mtime_ns
+
+def is_current(manifest, out_path, inputs_hash):
+    """True if out_path was last built from the same inputs and hasn't been rewritten since"""
+    record = manifest.get(out_path)
+    return isinstance(record, dict) and record.get('inputs') == inputs_hash and matches_file(record, out_path)
+
+def modified_outputs(manifest):
+    """Paths in a manifest whose file is missing or was rewritten since the build that recorded it"""
+    return {out_path for out_path, record in manifest.items()
+            if not isinstance(record, dict) or not matches_file(record, out_path)}
+
+def stamp_outputs(manifest):
+    """Record the size and mtime of every output written this build, once its render is done
+
+    Planning stores {'inputs': hash} for pages it re-renders; pages left
+    untouched keep their previous record.
+    """
+    for out_path, record in manifest.items():
+        if 'size' not in record and os.path.exists(out_path):
+            stat = os.stat(out_path)
+            record['size'] = stat.st_size
+            record['mtime_ns'] = stat.st_mtime_ns
+
+def content_lastmod(records, out_path, today):
+    """Return out_path's lastmod date, advancing it to today only when its content changed
+
+    records maps output path -> {hash, lastmod, size, mtime_ns} and is updated
+    in place; persist it with save_manifest(records, LASTMOD_PATH). Files whose
+    size and mtime match the record are not re-hashed.
+    """
+    try:
+        stat = os.stat(out_path)
+    except FileNotFoundError:
+        return today
+
+    record = records.get(out_path)
+    if record and record['size'] == stat.st_size and record['mtime_ns'] == stat.st_mtime_ns:
+        return record['lastmod']
+
+    digest = file_digest(out_path)
+    lastmod = record['lastmod'] if record and record['hash'] == digest else today
+    records[out_path] = {
+        'hash': digest,
+        'lastmod': lastmod,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns
+    }
+    return lastmod
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Build metrics and throttled progress output for the page generators
+Replaces one print() per page with a progress line every few seconds and a per-stage summary
+"""
+
+import heapq
+import json
+import os
+import time
+
+from store_data import CACHE_DIR
+
+METRICS_PATH = os.path.join(CACHE_DIR, 'build-metrics.json')
+
+# Seconds between progress lines
+PROGRESS_INTERVAL = 2.0
+
+# Pages listed in the slowest/largest sections of the summary
+TOP_PAGES = 20
+
+# Stages that render pages; their elapsed time, not the per-page times summed across workers, gives pages/s
+RENDER_STAGES = ('state pages', 'city pages')
+
+class ProgressReporter:
+    """Print "label: done/total" at most once per interval, plus a final line"""
+
+    def __init__(self, label, total, quiet=False, interval=PROGRESS_INTERVAL):
+        self.label = label
+        self.total = total
+        self.quiet = quiet
+        self.interval = interval
+        self.done = 0
+        self.start = time.perf_counter()
+        self.last_report = self.start
+
+    def _report(self, now):
+        elapsed = now - self.start
+        rate = self.done / elapsed if elapsed else 0
+        percent = self.done / self.total if self.total else 1
+        print(f"  {self.label}: {self.done:,}/{self.total:,} ({percent:.0%}), {rate:,.0f} pages/s", flush=True)
+        self.last_report = now
+
+    def update(self, count=1):
+        self.done += count
+        if self.quiet:
+            return
+        now = time.perf_counter()
+        if now - self.last_report >= self.interval:
+            self._report(now)
+
+    def finish(self):
+        if not self.quiet and self.total:
+            self._report(time.perf_counter())
+
+class BuildMetrics:
+    """Collect per-stage timings and per-page render time and size for one build"""
+
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+        self.stages = []
+        self.pages = []
+        self.unchanged = 0
+
+    def run(self, name, func, *args, **kwargs):
+        """Call func, record its elapsed time as stage name and return its result"""
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.stages.append((name, time.perf_counter() - start))
+        return result
+
+    def progress(self, label, total):
+        """Return a progress reporter that honours quiet mode"""
+        return ProgressReporter(label, total, quiet=self.quiet)
+
+    def record_page(self, out_path, seconds, size):
+        """Record one written page's render + write time, for the slowest pages list, and size in bytes"""
+        self.pages.append((out_path, seconds, size))
+
+    def summary(self):
+        """Return the metrics as a JSON-serializable dict"""
+        stage_times = {}
+        for name, elapsed in self.stages:
+            stage_times[name] = stage_times.get(name, 0) + elapsed
+        render_time = sum(stage_times.get(name, 0) for name in RENDER_STAGES)
+
+        def page_list(pages):
+            return [{'path': path, 'seconds': round(seconds, 6), 'bytes': size} for path, seconds, size in pages]
+
+        return {
+            'stages': stage_times,
+            'total_seconds': sum(stage_times.values()),
+            'pages_written': len(self.pages),
+            'pages_unchanged': self.unchanged,
+            'pages_per_sec': len(self.pages) / render_time if render_time else None,
+            'bytes_written': sum(size for _, _, size in self.pages),
+            'slowest_pages': page_list(heapq.nlargest(TOP_PAGES, self.pages, key=lambda page: page[1])),
+            'largest_pages': page_list(heapq.nlargest(TOP_PAGES, self.pages, key=lambda page: page[2]))
+        }
+
+    def write_json(self, path=METRICS_PATH):
+        """Write the summary as JSON"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def print_table(self):
+        """Print the summary as a human-readable table"""
+        summary = self.summary()
+        width = max([len(name) for name in summary['stages']] + [5])
+        print("Build metrics:")
+        for name, elapsed in summary['stages'].items():
+            print(f"  {name:<{width}}  {elapsed:8.3f} s")
+        print(f"  {'total':<{width}}  {summary['total_seconds']:8.3f} s")
+
+        pages_per_sec = summary['pages_per_sec'] or 0
+        print(f"Pages: {summary['pages_written']:,} written, {summary['pages_unchanged']:,} unchanged, "
+              f"{pages_per_sec:,.0f} pages/s, {summary['bytes_written']:,} bytes written")
+
+        if summary['slowest_pages']:
+            print(f"Slowest {len(summary['slowest_pages'])} pages:")
+            for page in summary['slowest_pages']:
+                print(f"  {page['seconds'] * 1000:9.2f} ms  {page['path']}")
+            print(f"Largest {len(summary['largest_pages'])} pages:")
+            for page in summary['largest_pages']:
+                print(f"  {page['bytes'] / 1024:9.1f} KB  {page['path']}")
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Local preview server that renders state and city pages on request
+Pages come from create_state_page/create_city_page against the in-memory dataset and are kept in a
+size-bounded LRU cache, dropped whenever the CSV or generate_all_pages.py changes; other paths are served from disk
+"""
+
+import argparse
+import importlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+import generate_all_pages
+from slugs import SlugRegistry
+from store_data import CSV_PATH, load_stores
+
+DEFAULT_PORT = 8000
+DEFAULT_CACHE_MB = 64
+
+class PageCache:
+    """LRU of rendered pages, bounded by their total size in bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.pages = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            body = self.pages.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self.pages.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.pages.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.pages[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self.pages.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.pages.clear()
+            self.size = 0
+
+class PreviewSite:
+    """Dataset, slugs and page cache behind the server, reloaded when an input changes"""
+
+    def __init__(self, csv_path=CSV_PATH, cache_bytes=DEFAULT_CACHE_MB * 1024 * 1024):
+        self.csv_path = csv_path
+        self.cache = PageCache(cache_bytes)
+        self.lock = threading.Lock()
+        self.stamps = None
+        self.data = None
+        self.generation = 0
+        self.refresh()
+
+    def _stamps(self):
+        """mtimes of the CSV and of the module holding the page templates"""
+        return os.stat(self.csv_path).st_mtime_ns, os.stat(generate_all_pages.__file__).st_mtime_ns
+
+    def _load(self):
+        start = time.perf_counter()
+        stores = load_stores(self.csv_path)
+        stores_by_state, stores_by_city, states_data = generate_all_pages.group_store_data(stores)
+        slugs = SlugRegistry({state: data['cities'] for state, data in states_data.items()})
+        print(f"Loaded {len(stores)} stores in {len(stores_by_state)} states "
+              f"and {len(stores_by_city)} cities in {time.perf_counter() - start:.2f} s")
+        return {
+            'stores_by_state': stores_by_state,
+            'stores_by_city': stores_by_city,
+            'states_data': states_data,
+            'slugs': slugs,
+            'nav_states': generate_all_pages.build_nav_states(stores_by_state, slugs)
+        }
+
+    def refresh(self):
+        """Reload the dataset or page code if either changed, dropping every cached page
+
+        Returns the current (data, generation) so a request renders and caches
+        against one consistent load.
+        """
+        with self.lock:
+            stamps = self._stamps()
+            if stamps == self.stamps:
+                return self.data, self.generation
+            if self.stamps is not None and stamps[1] != self.stamps[1]:
+                print("generate_all_pages.py changed, reloading page templates")
+                importlib.reload(generate_all_pages)
+            if self.stamps is None or stamps[0] != self.stamps[0]:
+                self.data = self._load()
+            self.stamps = stamps
+            self.generation += 1
+            self.cache.clear()
+            return self.data, self.generation
+
+    def page(self, path):
+        """Return (HTML bytes, cached) for a state or city URL path
+
+        Returns None when the path isn't a state slug or a known city under
+        one, so the caller can serve it from disk (or 404) instead.
+        """
+        data, generation = self.refresh()
+        slugs = data['slugs']
+        parts = [unquote(part) for part in path.strip('/').split('/')]
+        state = slugs.state_name(parts[0])
+        if state is None or len(parts) > 2:
+            return None
+
+        city = None
+        if len(parts) == 2:
+            city = slugs.city_name(parts[0], parts[1])
+            if city is None:
+                return None
+
+        key = (generation, tuple(parts))
+        body = self.cache.get(key)
+        if body is not None:
+            return body, True
+
+        if city is None:
+            html = generate_all_pages.create_state_page(state, data['stores_by_state'][state], data['states_data'],
+                                                        data['nav_states'], slugs)
+        else:
+            html = generate_all_pages.create_city_page(city, state, data['stores_by_city'][state, city],
+                                                       data['nav_states'], slugs)
+
+        body = html.encode('utf-8')
+        self.cache.put(key, body)
+        return body, False
+
+class PreviewHandler(SimpleHTTPRequestHandler):
+    """Serve rendered state and city pages, and every other path from the working directory"""
+
+    def __init__(self, *args, site=None, quiet=False, **kwargs):
+        self.site = site
+        self.quiet = quiet
+        super().__init__(*args, **kwargs)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    def _serve_page(self, include_body):
+        """Send a rendered page; returns False if the path isn't a page"""
+        path = urlsplit(self.path).path
+        start = time.perf_counter()
+        result = self.site.page(path)
+        if result is None:
+            return False
+
+        if not path.endswith('/'):
+            self.send_response(301)
+            self.send_header('Location', path + '/')
+            self.end_headers()
+            return True
+
+        body, cached = result
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-Cache', 'HIT' if cached else 'MISS')
+        self.send_header('Server-Timing', f"render;dur={(time.perf_counter() - start) * 1000:.2f}")
+        self.end_headers()
+        if include_body:
+            self.wfile.write(body)
+        return True
+
+    def do_GET(self):
+        if not self._serve_page(include_body=True):
+            super().do_GET()
+
+    def do_HEAD(self):
+        if not self._serve_page(include_body=False):
+            super().do_HEAD()
+
+def main():
+    parser = argparse.ArgumentParser(description="Preview the site, rendering state and city pages on request")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument('--bind', default='127.0.0.1', help="address to bind (default: 127.0.0.1)")
+    parser.add_argument('--csv', default=CSV_PATH, help=f"store dataset (default: {CSV_PATH})")
+    parser.add_argument('--cache-mb', type=float, default=DEFAULT_CACHE_MB, metavar='MB',
+                        help=f"rendered page cache size; 0 renders every request (default: {DEFAULT_CACHE_MB})")
+    parser.add_argument('--quiet', action='store_true', help="don't log each request")
+    args = parser.parse_args()
+
+    site = PreviewSite(args.csv, int(args.cache_mb * 1024 * 1024))
+    handler = partial(PreviewHandler, site=site, quiet=args.quiet)
+
+    server = ThreadingHTTPServer((args.bind, args.port), handler)
+    print(f"Serving on http://{args.bind}:{args.port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        cache = site.cache
+        print(f"\nPage cache: {cache.hits} hits, {cache.misses} misses, "
+              f"{len(cache.pages)} pages ({cache.size / (1024 * 1024):.1f} MB) cached")
+
+if __name__ == '__main__':
+    main()
@@ -4,111 +4,161 @@ Generate all state and city pages for Consignment Stores Directory
 Based on data from consignment_stores.csv
 """
 
-import csv
+import argparse
 import os
-import re
+import tempfile
+import time
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from urllib.parse import quote
 
-def slugify(text):
-    """Convert text to URL-friendly slug"""
-    text = text.lower()
-    text = re.sub(r'[^\w\s-]', '', text)
-    text = re.sub(r'[-\s]+', '-', text)
-    return text.strip('-')
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
 
-def get_price_level_text(pricing):
-    """Convert pricing code to display text"""
-    if pricing == "Low":
-        return "Affordable Pricing"
-    elif pricing == "High":
-        return "High-End Pricing"
-    else:
-        return "Mid-Range Pricing"
+import slugs as slugs_module
+import store_data
+from build_metrics import METRICS_PATH, BuildMetrics
+from build_manifest import file_digest, hash_inputs, is_current, load_manifest, save_manifest, stamp_outputs
+from precompress import default_targets, precompress
+from slugs import SlugRegistry
+from store_data import get_price_level_text, load_stores, read_spill, spill_by_state
+from store_ranking import ReviewRanking
+
+# Page markup lives in this module, feature and pricing text in store_data and
+# slugs in slugs.py, so an edit to any of them invalidates every page
+PAGE_SOURCES = [__file__, store_data.__file__, slugs_module.__file__]
+TEMPLATE_VERSION = hash_inputs([file_digest(path) for path in PAGE_SOURCES])
+
+# Page fragments are flushed to disk once this many bytes are buffered
+WRITE_BUFFER_SIZE = 64 * 1024
+
+# Columns of the "Stores by State" dropdown, by first letter of the state name
+NAV_COLUMNS = [
+    ('A - F', 'ABCDEF'),
+    ('G - M', 'GHIJKLM'),
+    ('N - W', 'NOPQRSTUVWXYZ')
+]
 
-def get_features_from_row(row):
-    """Extract store features from CSV row"""
-    features = []
-    feature_mapping = {
-        'pricing': get_price_level_text(row['pricing']),
-        'wide_selection': 'Wide Selection',
-        'sell_antiques': 'Antiques',
-        'sell_books': 'Books',
-        'clean_organized': 'Clean & Organized',
-        'sell_clothes': 'Clothing',
-        'sell_furniture': 'Furniture',
-        'sell_jewelry': 'Jewelry',
-        'sell_gift_items': 'Gift Items',
-        'sell_premium_brand': 'Premium Brands',
-        'sell_merchandise': 'General Merchandise',
-        'friendly_employees': 'Friendly Staff'
-    }
+NAV_HIGHLIGHT_STYLE = ' style="color: var(--primary-blue); font-weight: 600;"'
+
+FOOTER_QUICK_LINKS = '''    <footer>
+        <div class="footer-container">
+            <div class="footer-content">
+                <div class="footer-section">
+                    <h3>Quick Links</h3>
+                    <ul>
+                        <li><a href="/">Home</a></li>
+                        <li><a href="/about/">About Us</a></li>
+                        <li><a href="/sitemap/">Sitemap</a></li>
+                        <li><a href="/sitemap.xml">XML Sitemap</a></li>
+                    </ul>
+                </div>
+'''
+
+FOOTER_BOTTOM = '''            <div class="footer-bottom">
+                <p>&copy; 2024 Consignment Stores Near Me. All rights reserved.</p>
+            </div>
+        </div>
+    </footer>'''
+
+def group_store_data(stores, ranking=None):
+    """Group store records by state and by (state, city)
     
-    # Always add pricing level
-    features.append(get_price_level_text(row['pricing']))
+    Groups are filled from one review ranking of all the stores, so every
+    state's and city's list is in review order (most first, ties in CSV
+    order) and the page renderers take featured stores as a prefix.
+    """
+    if ranking is None:
+        ranking = ReviewRanking(stores)
+    states_data = {}
+    for store in stores:
+        state_data = states_data.setdefault(store.state, {'cities': set(), 'store_count': 0})
+        state_data['cities'].add(store.city)
+        state_data['store_count'] += 1
     
-    # Add other features if they're "Yes"
-    for field, display_name in feature_mapping.items():
-        if field != 'pricing' and row.get(field, '').strip().lower() == 'yes':
-            features.append(display_name)
+    # Keys are in CSV order, which the sitemap's tie-breaks depend on
+    stores_by_state = {state: ranking.state_top(state) for state in states_data}
+    city_keys = dict.fromkeys((store.state, store.city) for store in stores)
+    stores_by_city = {(state, city): ranking.city_top(state, city) for state, city in city_keys}
     
-    return features
+    return stores_by_state, stores_by_city, states_data
 
 def load_store_data():
-    """Load and process store data from CSV"""
-    stores_by_state = defaultdict(list)
-    stores_by_city = defaultdict(list)
-    states_data = defaultdict(lambda: {'cities': set(), 'store_count': 0})
+    """Group the shared store dataset by state and city"""
+    return group_store_data(load_stores())
+
+def build_nav_states(states, slugs):
+    """The header dropdown's (state, slug) pairs in name order, as the hashable tuple render_site_header takes"""
+    return tuple((state, slugs.state_slug(state)) for state in sorted(states))
+
+@lru_cache(maxsize=None)
+def render_site_header(nav_states, highlight):
+    """Render the shared header and state dropdown for a tuple of (state, slug) pairs
+
+    Cached per (nav_states, highlight), so each variant is built once per
+    build and every page yields the same string object.
+    """
+    state_style = NAV_HIGHLIGHT_STYLE if highlight == 'state' else ''
+    city_style = NAV_HIGHLIGHT_STYLE if highlight == 'city' else ''
     
-    with open('consignment_stores.csv', 'r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            state = row['State'].strip()
-            city = row['City'].strip()
-            
-            # Skip invalid entries
-            if not state or not city:
-                continue
-            
-            # Clean up state name (remove zip codes, etc.)
-            state = re.sub(r'\s+\d{5}"?$', '', state)
-            state = state.replace('"', '').strip()
-            
-            # Skip if state is actually a zip code or other invalid data
-            if state.isdigit() or len(state) < 3:
-                continue
-            
-            city_key = f"{city}, {state}"
-            
-            store_data = {
-                'name': row['Business Name'].strip(),
-                'address': row['Address'].strip(),
-                'city': city,
-                'state': state,
-                'phone': row.get('Phone', 'No data available').strip(),
-                'website': row.get('Site', 'No data available').strip(),
-                'reviews': int(row.get('Number of Reviews', 0) or 0),
-                'photo': row.get('Photo', '').strip(),
-                'features': get_features_from_row(row)
-            }
-            
-            stores_by_state[state].append(store_data)
-            stores_by_city[city_key].append(store_data)
-            states_data[state]['cities'].add(city)
-            states_data[state]['store_count'] += 1
+    columns = []
+    for heading, letters in NAV_COLUMNS:
+        column_states = [(state, slug) for state, slug in nav_states if state[:1].upper() in letters]
+        if not column_states:
+            continue
+        links = ''.join(
+            f'                                    <a href="/{slug}/" class="dropdown-item">{state}</a>\n'
+            for state, slug in column_states
+        )
+        columns.append(f'''                                <div class="dropdown-column">
+                                    <h4>{heading}</h4>
+{links}                                </div>
+''')
     
-    return stores_by_state, stores_by_city, states_data
+    return f'''    <header>
+        <div class="header-container">
+            <div class="logo">
+                <img src="/images/logo-main.svg" alt="Consignment Stores Near Me Logo">
+            </div>
+            <nav class="main-nav">
+                <ul class="nav-menu">
+                    <li class="nav-item">
+                        <a href="#" class="nav-link"{state_style}>Stores by State</a>
+                        <div class="dropdown">
+                            <div class="dropdown-columns">
+{''.join(columns)}                            </div>
+                        </div>
+                    </li>
+                    <li class="nav-item">
+                        <a href="#" class="nav-link"{city_style}>Store by City</a>
+                        <div class="dropdown">
+                            <div class="dropdown-content">
+                                <a href="/sitemap/" class="dropdown-item text-blue">View All Cities →</a>
+                            </div>
+                        </div>
+                    </li>
+                    <li class="nav-item">
+                        <a href="/about/" class="nav-link">About Us</a>
+                    </li>
+                </ul>
+            </nav>
+        </div>
+    </header>
+'''
 
-def create_state_page(state_name, stores, states_data):
-    """Generate HTML content for a state page"""
-    state_slug = slugify(state_name)
+def iter_state_page(state_name, stores, states_data, nav_states, slugs):
+    """Yield the HTML for a state page fragment by fragment; stores are in review order"""
+    state_slug = slugs.state_slug(state_name)
     cities = sorted(list(states_data[state_name]['cities']))
     store_count = states_data[state_name]['store_count']
     
     # Get top stores by reviews for featured section
-    top_stores = sorted(stores, key=lambda x: x['reviews'], reverse=True)[:6]
+    top_stores = stores[:6]
     
-    html_content = f'''<!DOCTYPE html>
+    yield f'''<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -155,95 +205,11 @@ def create_state_page(state_name, stores, states_data):
     </script>
 </head>
 <body>
-    <header>
-        <div class="header-container">
-            <div class="logo">
-                <img src="/images/logo-main.svg" alt="Consignment Stores Near Me Logo">
-            </div>
-            <nav class="main-nav">
-                <ul class="nav-menu">
-                    <li class="nav-item">
-                        <a href="#" class="nav-link" style="color: var(--primary-blue); font-weight: 600;">Stores by State</a>
-                        <div class="dropdown">
-                            <div class="dropdown-columns">
-                                <div class="dropdown-column">
-                                    <h4>A - F</h4>
-                                    <a href="/alabama/" class="dropdown-item">Alabama</a>
-                                    <a href="/alaska/" class="dropdown-item">Alaska</a>
-                                    <a href="/arizona/" class="dropdown-item">Arizona</a>
-                                    <a href="/arkansas/" class="dropdown-item">Arkansas</a>
-                                    <a href="/california/" class="dropdown-item">California</a>
-                                    <a href="/colorado/" class="dropdown-item">Colorado</a>
-                                    <a href="/connecticut/" class="dropdown-item">Connecticut</a>
-                                    <a href="/delaware/" class="dropdown-item">Delaware</a>
-                                    <a href="/florida/" class="dropdown-item">Florida</a>
-                                </div>
-                                <div class="dropdown-column">
-                                    <h4>G - M</h4>
-                                    <a href="/georgia/" class="dropdown-item">Georgia</a>
-                                    <a href="/hawaii/" class="dropdown-item">Hawaii</a>
-                                    <a href="/idaho/" class="dropdown-item">Idaho</a>
-                                    <a href="/illinois/" class="dropdown-item">Illinois</a>
-                                    <a href="/indiana/" class="dropdown-item">Indiana</a>
-                                    <a href="/iowa/" class="dropdown-item">Iowa</a>
-                                    <a href="/kansas/" class="dropdown-item">Kansas</a>
-                                    <a href="/kentucky/" class="dropdown-item">Kentucky</a>
-                                    <a href="/louisiana/" class="dropdown-item">Louisiana</a>
-                                    <a href="/maine/" class="dropdown-item">Maine</a>
-                                    <a href="/maryland/" class="dropdown-item">Maryland</a>
-                                    <a href="/massachusetts/" class="dropdown-item">Massachusetts</a>
-                                    <a href="/michigan/" class="dropdown-item">Michigan</a>
-                                    <a href="/minnesota/" class="dropdown-item">Minnesota</a>
-                                    <a href="/mississippi/" class="dropdown-item">Mississippi</a>
-                                    <a href="/missouri/" class="dropdown-item">Missouri</a>
-                                    <a href="/montana/" class="dropdown-item">Montana</a>
-                                </div>
-                                <div class="dropdown-column">
-                                    <h4>N - W</h4>
-                                    <a href="/nebraska/" class="dropdown-item">Nebraska</a>
-                                    <a href="/nevada/" class="dropdown-item">Nevada</a>
-                                    <a href="/new-hampshire/" class="dropdown-item">New Hampshire</a>
-                                    <a href="/new-jersey/" class="dropdown-item">New Jersey</a>
-                                    <a href="/new-mexico/" class="dropdown-item">New Mexico</a>
-                                    <a href="/new-york/" class="dropdown-item">New York</a>
-                                    <a href="/north-carolina/" class="dropdown-item">North Carolina</a>
-                                    <a href="/north-dakota/" class="dropdown-item">North Dakota</a>
-                                    <a href="/ohio/" class="dropdown-item">Ohio</a>
-                                    <a href="/oklahoma/" class="dropdown-item">Oklahoma</a>
-                                    <a href="/oregon/" class="dropdown-item">Oregon</a>
-                                    <a href="/pennsylvania/" class="dropdown-item">Pennsylvania</a>
-                                    <a href="/rhode-island/" class="dropdown-item">Rhode Island</a>
-                                    <a href="/south-carolina/" class="dropdown-item">South Carolina</a>
-                                    <a href="/south-dakota/" class="dropdown-item">South Dakota</a>
-                                    <a href="/tennessee/" class="dropdown-item">Tennessee</a>
-                                    <a href="/texas/" class="dropdown-item">Texas</a>
-                                    <a href="/utah/" class="dropdown-item">Utah</a>
-                                    <a href="/vermont/" class="dropdown-item">Vermont</a>
-                                    <a href="/virginia/" class="dropdown-item">Virginia</a>
-                                    <a href="/washington/" class="dropdown-item">Washington</a>
-                                    <a href="/west-virginia/" class="dropdown-item">West Virginia</a>
-                                    <a href="/wisconsin/" class="dropdown-item">Wisconsin</a>
-                                    <a href="/wyoming/" class="dropdown-item">Wyoming</a>
-                                </div>
-                            </div>
-                        </div>
-                    </li>
-                    <li class="nav-item">
-                        <a href="#" class="nav-link">Store by City</a>
-                        <div class="dropdown">
-                            <div class="dropdown-content">
-                                <a href="/sitemap/" class="dropdown-item text-blue">View All Cities →</a>
-                            </div>
-                        </div>
-                    </li>
-                    <li class="nav-item">
-                        <a href="/about/" class="nav-link">About Us</a>
-                    </li>
-                </ul>
-            </nav>
-        </div>
-    </header>
-
+'''
+    
+    yield render_site_header(nav_states, 'state')
+    
+    yield f'''
     <main>
         <!-- Breadcrumb Navigation -->
         <nav class="breadcrumb" aria-label="Breadcrumb">
@@ -279,7 +245,7 @@ def create_state_page(state_name, stores, states_data):
     
     # Add featured stores section
     if top_stores:
-        html_content += '''
+        yield '''
         <!-- Featured Stores Section -->
         <section class="featured-stores">
             <div class="container">
@@ -288,43 +254,42 @@ def create_state_page(state_name, stores, states_data):
 '''
         
         for store in top_stores[:3]:  # Show top 3 stores
-            features_html = ''.join([f'<span class="feature-tag">{feature}</span>' for feature in store['features'][:4]])
+            features_html = ''.join([f'<span class="feature-tag">{feature}</span>' for feature in store.features[:4]])
             website_link = ''
-            if store['website'] and store['website'] != 'No data available':
-                website_link = f'<a href="{store["website"]}" class="btn-secondary" target="_blank">Visit Website</a>'
+            if store.website and store.website != 'No data available':
+                website_link = f'<a href="{store.website}" class="btn-secondary" target="_blank">Visit Website</a>'
             
-            city_slug = slugify(store['city'])
-            state_slug_lower = slugify(state_name)
+            city_slug = slugs.city_slug(state_name, store.city)
             
-            html_content += f'''
+            yield f'''
                     <article class="store-card">
-                        <img src="{store['photo'] if store['photo'] else '/images/store-placeholder.jpg'}" alt="{store['name']} in {store['city']}, {state_name}" class="store-image">
+                        <img src="{store.photo if store.photo else '/images/store-placeholder.jpg'}" alt="{store.name} in {store.city}, {state_name}" class="store-image">
                         <div class="store-info">
-                            <h3 class="store-name">{store['name']}</h3>
-                            <p class="store-address">{store['city']}, {state_name}</p>
+                            <h3 class="store-name">{store.name}</h3>
+                            <p class="store-address">{store.city}, {state_name}</p>
                             <div class="store-details">
-                                <span class="store-reviews">{store['reviews']} reviews</span>
-                                <span class="store-phone">{store['phone']}</span>
+                                <span class="store-reviews">{store.reviews} reviews</span>
+                                <span class="store-phone">{store.phone}</span>
                             </div>
                             <div class="store-features">
                                 {features_html}
                             </div>
                             <div class="store-actions">
-                                <a href="/{state_slug_lower}/{city_slug}/" class="btn-primary">View Details</a>
+                                <a href="/{state_slug}/{city_slug}/" class="btn-primary">View Details</a>
                                 {website_link}
                             </div>
                         </div>
                     </article>
 '''
         
-        html_content += '''
+        yield '''
                 </div>
             </div>
         </section>
 '''
     
     # Add all cities section
-    html_content += f'''
+    yield f'''
         <!-- All Cities Section -->
         <section class="all-cities">
             <div class="container">
@@ -336,21 +301,21 @@ def create_state_page(state_name, stores, states_data):
     # Add cities with store counts
     city_counts = defaultdict(int)
     for store in stores:
-        city_counts[store['city']] += 1
+        city_counts[store.city] += 1
     
     for city in sorted(cities):
-        city_slug = slugify(city)
+        city_slug = slugs.city_slug(state_name, city)
         count = city_counts[city]
         plural = "store" if count == 1 else "stores"
         
-        html_content += f'''
+        yield f'''
                     <div class="city-item">
                         <h3><a href="/{state_slug}/{city_slug}/">{city}</a></h3>
                         <p>{count} {plural}</p>
                     </div>
 '''
     
-    html_content += '''
+    yield '''
                 </div>
             </div>
         </section>
@@ -378,19 +343,11 @@ def create_state_page(state_name, stores, states_data):
         </section>
     </main>
 
-    <footer>
-        <div class="footer-container">
-            <div class="footer-content">
-                <div class="footer-section">
-                    <h3>Quick Links</h3>
-                    <ul>
-                        <li><a href="/">Home</a></li>
-                        <li><a href="/about/">About Us</a></li>
-                        <li><a href="/sitemap/">Sitemap</a></li>
-                        <li><a href="/sitemap.xml">XML Sitemap</a></li>
-                    </ul>
-                </div>
-                <div class="footer-section">
+'''
+    
+    yield FOOTER_QUICK_LINKS
+    
+    yield '''                <div class="footer-section">
                     <h3>''' + state_name + ''' Cities</h3>
                     <ul>
 '''
@@ -398,10 +355,10 @@ def create_state_page(state_name, stores, states_data):
     # Add top cities to footer
     top_cities = sorted(cities)[:5]
     for city in top_cities:
-        city_slug = slugify(city)
-        html_content += f'                        <li><a href="/{state_slug}/{city_slug}/">{city} Consignment Stores</a></li>\n'
+        city_slug = slugs.city_slug(state_name, city)
+        yield f'                        <li><a href="/{state_slug}/{city_slug}/">{city} Consignment Stores</a></li>\n'
     
-    html_content += '''
+    yield '''
                     </ul>
                 </div>
                 <div class="footer-section">
@@ -415,11 +372,11 @@ def create_state_page(state_name, stores, states_data):
                     </ul>
                 </div>
             </div>
-            <div class="footer-bottom">
-                <p>&copy; 2024 Consignment Stores Near Me. All rights reserved.</p>
-            </div>
-        </div>
-    </footer>
+'''
+    
+    yield FOOTER_BOTTOM
+    
+    yield '''
 
     <style>
         .state-hero {
@@ -528,19 +485,17 @@ def create_state_page(state_name, stores, states_data):
     </style>
 </body>
 </html>'''
-    
-    return html_content
 
-def create_city_page(city_name, state_name, stores):
-    """Generate HTML content for a city page"""
-    city_slug = slugify(city_name)
-    state_slug = slugify(state_name)
+def iter_city_page(city_name, state_name, stores, nav_states, slugs):
+    """Yield the HTML for a city page fragment by fragment; stores are in review order"""
+    city_slug = slugs.city_slug(state_name, city_name)
+    state_slug = slugs.state_slug(state_name)
     
-    # Sort stores by reviews (descending)
-    sorted_stores = sorted(stores, key=lambda x: x['reviews'], reverse=True)
+    # Stores arrive sorted by reviews (descending)
+    sorted_stores = stores
     store_count = len(stores)
     
-    html_content = f'''<!DOCTYPE html>
+    yield f'''<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -588,95 +543,11 @@ def create_city_page(city_name, state_name, stores):
     </script>
 </head>
 <body>
-    <header>
-        <div class="header-container">
-            <div class="logo">
-                <img src="/images/logo-main.svg" alt="Consignment Stores Near Me Logo">
-            </div>
-            <nav class="main-nav">
-                <ul class="nav-menu">
-                    <li class="nav-item">
-                        <a href="#" class="nav-link">Stores by State</a>
-                        <div class="dropdown">
-                            <div class="dropdown-columns">
-                                <div class="dropdown-column">
-                                    <h4>A - F</h4>
-                                    <a href="/alabama/" class="dropdown-item">Alabama</a>
-                                    <a href="/alaska/" class="dropdown-item">Alaska</a>
-                                    <a href="/arizona/" class="dropdown-item">Arizona</a>
-                                    <a href="/arkansas/" class="dropdown-item">Arkansas</a>
-                                    <a href="/california/" class="dropdown-item">California</a>
-                                    <a href="/colorado/" class="dropdown-item">Colorado</a>
-                                    <a href="/connecticut/" class="dropdown-item">Connecticut</a>
-                                    <a href="/delaware/" class="dropdown-item">Delaware</a>
-                                    <a href="/florida/" class="dropdown-item">Florida</a>
-                                </div>
-                                <div class="dropdown-column">
-                                    <h4>G - M</h4>
-                                    <a href="/georgia/" class="dropdown-item">Georgia</a>
-                                    <a href="/hawaii/" class="dropdown-item">Hawaii</a>
-                                    <a href="/idaho/" class="dropdown-item">Idaho</a>
-                                    <a href="/illinois/" class="dropdown-item">Illinois</a>
-                                    <a href="/indiana/" class="dropdown-item">Indiana</a>
-                                    <a href="/iowa/" class="dropdown-item">Iowa</a>
-                                    <a href="/kansas/" class="dropdown-item">Kansas</a>
-                                    <a href="/kentucky/" class="dropdown-item">Kentucky</a>
-                                    <a href="/louisiana/" class="dropdown-item">Louisiana</a>
-                                    <a href="/maine/" class="dropdown-item">Maine</a>
-                                    <a href="/maryland/" class="dropdown-item">Maryland</a>
-                                    <a href="/massachusetts/" class="dropdown-item">Massachusetts</a>
-                                    <a href="/michigan/" class="dropdown-item">Michigan</a>
-                                    <a href="/minnesota/" class="dropdown-item">Minnesota</a>
-                                    <a href="/mississippi/" class="dropdown-item">Mississippi</a>
-                                    <a href="/missouri/" class="dropdown-item">Missouri</a>
-                                    <a href="/montana/" class="dropdown-item">Montana</a>
-                                </div>
-                                <div class="dropdown-column">
-                                    <h4>N - W</h4>
-                                    <a href="/nebraska/" class="dropdown-item">Nebraska</a>
-                                    <a href="/nevada/" class="dropdown-item">Nevada</a>
-                                    <a href="/new-hampshire/" class="dropdown-item">New Hampshire</a>
-                                    <a href="/new-jersey/" class="dropdown-item">New Jersey</a>
-                                    <a href="/new-mexico/" class="dropdown-item">New Mexico</a>
-                                    <a href="/new-york/" class="dropdown-item">New York</a>
-                                    <a href="/north-carolina/" class="dropdown-item">North Carolina</a>
-                                    <a href="/north-dakota/" class="dropdown-item">North Dakota</a>
-                                    <a href="/ohio/" class="dropdown-item">Ohio</a>
-                                    <a href="/oklahoma/" class="dropdown-item">Oklahoma</a>
-                                    <a href="/oregon/" class="dropdown-item">Oregon</a>
-                                    <a href="/pennsylvania/" class="dropdown-item">Pennsylvania</a>
-                                    <a href="/rhode-island/" class="dropdown-item">Rhode Island</a>
-                                    <a href="/south-carolina/" class="dropdown-item">South Carolina</a>
-                                    <a href="/south-dakota/" class="dropdown-item">South Dakota</a>
-                                    <a href="/tennessee/" class="dropdown-item">Tennessee</a>
-                                    <a href="/texas/" class="dropdown-item">Texas</a>
-                                    <a href="/utah/" class="dropdown-item">Utah</a>
-                                    <a href="/vermont/" class="dropdown-item">Vermont</a>
-                                    <a href="/virginia/" class="dropdown-item">Virginia</a>
-                                    <a href="/washington/" class="dropdown-item">Washington</a>
-                                    <a href="/west-virginia/" class="dropdown-item">West Virginia</a>
-                                    <a href="/wisconsin/" class="dropdown-item">Wisconsin</a>
-                                    <a href="/wyoming/" class="dropdown-item">Wyoming</a>
-                                </div>
-                            </div>
-                        </div>
-                    </li>
-                    <li class="nav-item">
-                        <a href="#" class="nav-link" style="color: var(--primary-blue); font-weight: 600;">Store by City</a>
-                        <div class="dropdown">
-                            <div class="dropdown-content">
-                                <a href="/sitemap/" class="dropdown-item text-blue">View All Cities →</a>
-                            </div>
-                        </div>
-                    </li>
-                    <li class="nav-item">
-                        <a href="/about/" class="nav-link">About Us</a>
-                    </li>
-                </ul>
-            </nav>
-        </div>
-    </header>
-
+'''
+    
+    yield render_site_header(nav_states, 'city')
+    
+    yield f'''
     <main>
         <!-- Breadcrumb Navigation -->
         <nav class="breadcrumb" aria-label="Breadcrumb">
@@ -710,31 +581,31 @@ def create_city_page(city_name, state_name, stores):
     
     # Add individual store listings
     for store in sorted_stores:
-        features_html = ''.join([f'<span class="feature-tag positive">{feature}</span>' for feature in store['features'][:6]])
+        features_html = ''.join([f'<span class="feature-tag positive">{feature}</span>' for feature in store.features[:6]])
         website_link = ''
-        if store['website'] and store['website'] != 'No data available':
+        if store.website and store.website != 'No data available':
             website_link = f'''
-                                    <strong>Website:</strong> <a href="{store['website']}" target="_blank">{store['website']}</a>'''
+                                    <strong>Website:</strong> <a href="{store.website}" target="_blank">{store.website}</a>'''
         
-        specialties = ', '.join(store['features'][:3])
+        specialties = ', '.join(store.features[:3])
         
-        html_content += f'''
+        yield f'''
                     <article class="store-listing">
                         <div class="store-image-container">
-                            <img src="{store['photo'] if store['photo'] else '/images/store-placeholder.jpg'}" alt="{store['name']}" class="store-image">
+                            <img src="{store.photo if store.photo else '/images/store-placeholder.jpg'}" alt="{store.name}" class="store-image">
                         </div>
                         <div class="store-details">
-                            <h3 class="store-name">{store['name']}</h3>
+                            <h3 class="store-name">{store.name}</h3>
                             <div class="store-rating">
-                                <span class="review-count">{store['reviews']} reviews</span>
+                                <span class="review-count">{store.reviews} reviews</span>
                                 <span class="rating-separator">•</span>
-                                <span class="price-level">{get_price_level_text(store.get('pricing', 'Mid-Range'))}</span>
+                                <span class="price-level">{get_price_level_text(store.pricing)}</span>
                             </div>
                             <div class="store-address">
-                                <strong>Address:</strong> {store['address']}
+                                <strong>Address:</strong> {store.address}
                             </div>
                             <div class="store-contact">
-                                <strong>Phone:</strong> <a href="tel:{store['phone']}">{store['phone']}</a>{website_link}
+                                <strong>Phone:</strong> <a href="tel:{store.phone}">{store.phone}</a>{website_link}
                             </div>
                             <div class="store-features">
                                 <h4>Store Features:</h4>
@@ -751,7 +622,7 @@ def create_city_page(city_name, state_name, stores):
     
     store_plural = 's' if store_count != 1 else ''
     
-    html_content += f'''
+    yield f'''
                 </div>
             </div>
         </section>
@@ -776,19 +647,11 @@ def create_city_page(city_name, state_name, stores):
         </section>
     </main>
 
-    <footer>
-        <div class="footer-container">
-            <div class="footer-content">
-                <div class="footer-section">
-                    <h3>Quick Links</h3>
-                    <ul>
-                        <li><a href="/">Home</a></li>
-                        <li><a href="/about/">About Us</a></li>
-                        <li><a href="/sitemap/">Sitemap</a></li>
-                        <li><a href="/sitemap.xml">XML Sitemap</a></li>
-                    </ul>
-                </div>
-                <div class="footer-section">
+'''
+    
+    yield FOOTER_QUICK_LINKS
+    
+    yield '''                <div class="footer-section">
                     <h3>Store Categories</h3>
                     <ul>
                         <li>Designer Consignment</li>
@@ -799,11 +662,9 @@ def create_city_page(city_name, state_name, stores):
                     </ul>
                 </div>
             </div>
-            <div class="footer-bottom">
-                <p>&copy; 2024 Consignment Stores Near Me. All rights reserved.</p>
-            </div>
-        </div>
-    </footer>'''
+'''
+    
+    yield FOOTER_BOTTOM
     
     # Add CSS styles as separate string to avoid f-string issues
     css_styles = '''
@@ -966,65 +827,215 @@ def create_city_page(city_name, state_name, stores):
 </body>
 </html>'''
     
-    html_content += css_styles
-    
-    return html_content
+    yield css_styles
 
-def main():
-    """Main function to generate all pages"""
-    print("Starting comprehensive website expansion...")
+def create_state_page(state_name, stores, states_data, nav_states, slugs):
+    """Generate HTML content for a state page"""
+    return ''.join(iter_state_page(state_name, stores, states_data, nav_states, slugs))
+
+def create_city_page(city_name, state_name, stores, nav_states, slugs):
+    """Generate HTML content for a city page"""
+    return ''.join(iter_city_page(city_name, state_name, stores, nav_states, slugs))
+
+def write_page(out_path, fragments):
+    """Stream page fragments through a buffered writer straight to out_path, returning its size in bytes"""
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+        for fragment in fragments:
+            f.write(fragment)
+    return os.path.getsize(out_path)
+
+def render_page(job):
+    """Render and write one page job, returning (out_path, seconds, bytes written)"""
+    kind, out_path, args = job
+    start = time.perf_counter()
     
-    # Load data
-    print("Loading store data from CSV...")
-    stores_by_state, stores_by_city, states_data = load_store_data()
+    if kind == 'state':
+        fragments = iter_state_page(*args)
+    else:
+        fragments = iter_city_page(*args)
+    size = write_page(out_path, fragments)
     
-    print(f"Loaded data for {len(stores_by_state)} states and {len(stores_by_city)} cities")
+    return out_path, time.perf_counter() - start, size
+
+def run_page_jobs(jobs, metrics, label, executor=None, workers=1):
+    """Render jobs in order, or across the process pool when one is given"""
+    if executor is None:
+        results = map(render_page, jobs)
+    else:
+        chunksize = max(1, len(jobs) // (workers * 4))
+        results = executor.map(render_page, jobs, chunksize=chunksize)
     
-    # Create state directories and pages
-    print("Generating state pages...")
+    progress = metrics.progress(label, len(jobs))
+    for out_path, seconds, size in results:
+        metrics.record_page(out_path, seconds, size)
+        progress.update()
+    progress.finish()
+    return len(jobs)
+
+def plan_state_pages(stores_by_state, states_data, nav_states, slugs, previous_manifest, manifest):
+    """Return render jobs for stale state pages and the count of unchanged ones"""
+    jobs = []
+    unchanged = 0
     for state_name, stores in stores_by_state.items():
         if len(stores) < 1:  # Skip states with no stores
             continue
             
-        state_slug = slugify(state_name)
-        state_dir = f"{state_slug}"
+        state_slugs = slugs.subset(state_name)
+        out_path = f"{state_slugs.state_slug(state_name)}/index.html"
         
-        # Create state directory
-        os.makedirs(state_dir, exist_ok=True)
-        
-        # Generate state page
-        html_content = create_state_page(state_name, stores, states_data)
-        
-        with open(f"{state_dir}/index.html", 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        city_slugs = sorted(state_slugs.city_slugs.values())
+        inputs_hash = hash_inputs(TEMPLATE_VERSION, nav_states, 'state', state_name, city_slugs, stores)
+        if is_current(previous_manifest, out_path, inputs_hash):
+            manifest[out_path] = previous_manifest[out_path]
+            unchanged += 1
+            continue
+        manifest[out_path] = {'inputs': inputs_hash}
         
-        print(f"  Created {state_name} state page ({len(stores)} stores)")
+        # Only this state's entry is shipped to the worker
+        state_info = {state_name: states_data[state_name]}
+        jobs.append(('state', out_path, (state_name, stores, state_info, nav_states, state_slugs)))
     
-    # Create city directories and pages
-    print("Generating city pages...")
-    for city_key, stores in stores_by_city.items():
+    return jobs, unchanged
+
+def plan_city_pages(stores_by_city, nav_states, slugs, previous_manifest, manifest):
+    """Return render jobs for stale city pages and the count of unchanged ones"""
+    jobs = []
+    unchanged = 0
+    state_slugs = {}
+    for (state_name, city_name), stores in stores_by_city.items():
         if len(stores) < 1:  # Skip cities with no stores
             continue
             
-        city_name, state_name = city_key.split(', ', 1)
-        city_slug = slugify(city_name)
-        state_slug = slugify(state_name)
-        
-        city_dir = f"{state_slug}/{city_slug}"
+        if state_name not in state_slugs:
+            state_slugs[state_name] = slugs.subset(state_name)
+        city_slug = slugs.city_slug(state_name, city_name)
+        out_path = f"{slugs.state_slug(state_name)}/{city_slug}/index.html"
         
-        # Create city directory
-        os.makedirs(city_dir, exist_ok=True)
+        inputs_hash = hash_inputs(TEMPLATE_VERSION, nav_states, 'city', city_name, state_name, city_slug, stores)
+        if is_current(previous_manifest, out_path, inputs_hash):
+            manifest[out_path] = previous_manifest[out_path]
+            unchanged += 1
+            continue
+        manifest[out_path] = {'inputs': inputs_hash}
         
-        # Generate city page
-        html_content = create_city_page(city_name, state_name, stores)
+        jobs.append(('city', out_path, (city_name, state_name, stores, nav_states, state_slugs[state_name])))
+    
+    return jobs, unchanged
+
+def build_all(executor, workers, previous_manifest, manifest, metrics):
+    """Load the whole dataset, then render every state page followed by every city page"""
+    print("Loading store data...")
+    stores = metrics.run('load', load_stores)
+    stores_by_state, stores_by_city, states_data = metrics.run('group', group_store_data, stores)
+    
+    print(f"Loaded data for {len(stores_by_state)} states and {len(stores_by_city)} cities")
+    
+    # One slug registry for the whole dataset, so colliding city names get distinct pages
+    slugs = SlugRegistry({state: data['cities'] for state, data in states_data.items()})
+    slugs.report_collisions()
+    
+    # The header dropdown lists every state in the dataset
+    nav_states = build_nav_states(stores_by_state, slugs)
+    
+    state_jobs, unchanged = metrics.run('plan', plan_state_pages, stores_by_state, states_data, nav_states, slugs, previous_manifest, manifest)
+    city_jobs, city_unchanged = metrics.run('plan', plan_city_pages, stores_by_city, nav_states, slugs, previous_manifest, manifest)
+    unchanged += city_unchanged
+    
+    # Create state directories and pages
+    print("Generating state pages...")
+    written = metrics.run('state pages', run_page_jobs, state_jobs, metrics, 'state pages', executor, workers)
+    
+    # Create city directories and pages
+    print("Generating city pages...")
+    written += metrics.run('city pages', run_page_jobs, city_jobs, metrics, 'city pages', executor, workers)
+    
+    return len(stores_by_state), len(stores_by_city), written, unchanged
+
+def build_streaming(executor, workers, previous_manifest, manifest, metrics):
+    """Stream the CSV through an on-disk spill and render one state at a time"""
+    print("Streaming store data by state...")
+    state_count = city_count = written = unchanged = 0
+    
+    with tempfile.TemporaryDirectory(prefix='store-spill-') as spill_dir:
+        spill_files = metrics.run('spill', spill_by_state, spill_dir)
         
-        with open(f"{city_dir}/index.html", 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        # The header dropdown lists every state, known once the spill is done
+        slugs = SlugRegistry({state: () for state in spill_files})
+        nav_states = build_nav_states(spill_files, slugs)
         
-        print(f"  Created {city_name}, {state_name} city page ({len(stores)} stores)")
+        for state_name, spill_path in spill_files.items():
+            stores = metrics.run('load', read_spill, spill_path)
+            stores_by_state, stores_by_city, states_data = metrics.run('group', group_store_data, stores)
+            
+            # Slug collisions are per state, so each state's cities are registered as it is read
+            slugs.add_state(state_name, states_data[state_name]['cities'])
+            
+            state_jobs, state_unchanged = metrics.run('plan', plan_state_pages, stores_by_state, states_data, nav_states, slugs, previous_manifest, manifest)
+            city_jobs, city_unchanged = metrics.run('plan', plan_city_pages, stores_by_city, nav_states, slugs, previous_manifest, manifest)
+            
+            if not metrics.quiet:
+                print(f"Generating {state_name} pages...")
+            written += metrics.run('state pages', run_page_jobs, state_jobs, metrics, f"{state_name} state page", executor, workers)
+            written += metrics.run('city pages', run_page_jobs, city_jobs, metrics, f"{state_name} city pages", executor, workers)
+            
+            state_count += 1
+            city_count += len(stores_by_city)
+            unchanged += state_unchanged + city_unchanged
+    
+    slugs.report_collisions()
+    return state_count, city_count, written, unchanged
+
+def main(argv=None):
+    """Main function to generate all pages"""
+    parser = argparse.ArgumentParser(description="Generate state and city pages from the store dataset")
+    parser.add_argument('--force', action='store_true',
+                        help="re-render every page even if its inputs are unchanged")
+    parser.add_argument('--jobs', type=int, default=1, metavar='N',
+                        help="render pages across N worker processes (default: 1)")
+    parser.add_argument('--stream', action='store_true',
+                        help="group rows by state on disk and build one state at a time to bound memory")
+    parser.add_argument('--precompress', action='store_true',
+                        help="write .gz/.br siblings for every page and sitemap after the build")
+    parser.add_argument('--quiet', action='store_true',
+                        help="no per-page progress output, only the final summary")
+    parser.add_argument('--metrics', default=METRICS_PATH, metavar='PATH',
+                        help=f"write the build metrics summary as JSON to PATH (default: {METRICS_PATH})")
+    args = parser.parse_args(argv)
+    
+    print("Starting comprehensive website expansion...")
+    
+    # Pages whose inputs hash matches the last build are left untouched
+    previous_manifest = {} if args.force else load_manifest()
+    manifest = {}
+    metrics = BuildMetrics(quiet=args.quiet)
+    
+    build = build_streaming if args.stream else build_all
+    executor = ProcessPoolExecutor(max_workers=args.jobs) if args.jobs > 1 else None
+    try:
+        state_count, city_count, written, unchanged = build(executor, args.jobs, previous_manifest, manifest, metrics)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    
+    stamp_outputs(manifest)
+    metrics.run('manifest', save_manifest, manifest)
+    metrics.unchanged = unchanged
+    
+    if args.precompress:
+        print("Precompressing pages...")
+        metrics.run('precompress', precompress, default_targets(), args.jobs)
     
     print(f"Website expansion completed!")
-    print(f"Generated {len(stores_by_state)} state pages and {len(stores_by_city)} city pages")
+    print(f"Generated {state_count} state pages and {city_count} city pages")
+    print(f"Wrote {written} pages, {unchanged} unchanged since last build")
+    if args.stream and resource is not None:
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"Peak RSS: {peak_mb:.1f} MB")
+    
+    metrics.print_table()
+    metrics.write_json(args.metrics)
+    print(f"Build metrics written to {args.metrics}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,129 +1,222 @@
 #!/usr/bin/env python3
 
-import csv
+import argparse
+import gzip
+import io
+import os
+import re
 import xml.dom.minidom
 from datetime import datetime
-from collections import defaultdict
 
-def slugify(text):
-    """Convert text to URL-friendly slug"""
-    import re
-    text = text.lower()
-    text = re.sub(r'[^\w\s-]', '', text)
-    text = re.sub(r'[-\s]+', '-', text)
-    return text.strip('-')
+from build_manifest import LASTMOD_PATH, content_lastmod, load_manifest, save_manifest
+from slugs import SlugRegistry
+from store_data import group_cities_by_state, load_stores
 
-def generate_complete_sitemap():
-    """Generate complete XML sitemap with all pages"""
-    
-    # State name to URL slug mapping
-    state_slugs = {
-        'Alabama': 'alabama', 'Alaska': 'alaska', 'Arizona': 'arizona', 'Arkansas': 'arkansas',
-        'California': 'california', 'Colorado': 'colorado', 'Connecticut': 'connecticut',
-        'Delaware': 'delaware', 'Florida': 'florida', 'Georgia': 'georgia', 'Hawaii': 'hawaii',
-        'Idaho': 'idaho', 'Illinois': 'illinois', 'Indiana': 'indiana', 'Iowa': 'iowa',
-        'Kansas': 'kansas', 'Kentucky': 'kentucky', 'Louisiana': 'louisiana', 'Maine': 'maine',
-        'Maryland': 'maryland', 'Massachusetts': 'massachusetts', 'Michigan': 'michigan',
-        'Minnesota': 'minnesota', 'Mississippi': 'mississippi', 'Missouri': 'missouri',
-        'Montana': 'montana', 'Nebraska': 'nebraska', 'Nevada': 'nevada', 'New Hampshire': 'new-hampshire',
-        'New Jersey': 'new-jersey', 'New Mexico': 'new-mexico', 'New York': 'new-york',
-        'North Carolina': 'north-carolina', 'North Dakota': 'north-dakota', 'Ohio': 'ohio',
-        'Oklahoma': 'oklahoma', 'Oregon': 'oregon', 'Pennsylvania': 'pennsylvania',
-        'Rhode Island': 'rhode-island', 'South Carolina': 'south-carolina', 'South Dakota': 'south-dakota',
-        'Tennessee': 'tennessee', 'Texas': 'texas', 'Utah': 'utah', 'Vermont': 'vermont',
-        'Virginia': 'virginia', 'Washington': 'washington', 'West Virginia': 'west-virginia',
-        'Wisconsin': 'wisconsin', 'Wyoming': 'wyoming', 'District of Columbia': 'district-of-columbia'
-    }
-    
-    # Read CSV and organize data
-    state_cities = defaultdict(set)
-    
-    with open('consignment_stores.csv', 'r', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            state = row['State'].strip()
-            city = row['City'].strip()
-            if state and city:
-                state_cities[state].add(city)
+SITE_URL = 'https://www.consignmentstores.site'
+SITEMAP_PATH = 'sitemap.xml'
+SITEMAP_INDEX_PATH = 'sitemap_index.xml'
+
+# Search engine limits per sitemap file (URL count and uncompressed size)
+MAX_SITEMAP_URLS = 50000
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024
+
+SITEMAP_HEADER = [
+    '<?xml version="1.0" encoding="UTF-8"?>',
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+]
+SITEMAP_FOOTER = '</urlset>'
+
+class SitemapWriter:
+    """Stream sitemap lines to disk, rolling over into gzip shards at the size limits
+
+    Only the current shard's counters are held in memory, so memory use does
+    not grow with the number of URLs. In single-file mode everything goes to
+    sitemap.xml exactly as the old list-building code laid it out.
+    """
+    
+    def __init__(self, sharded=False):
+        self.sharded = sharded
+        self.shard_paths = []
+        self.shard_lastmods = []
+        self._file = None
+        self._urls = 0
+        self._bytes = 0
+        self._first_line = True
+    
+    def _open(self):
+        if self.sharded:
+            path = f'sitemap-{len(self.shard_paths) + 1}.xml.gz'
+            raw = open(path, 'wb')
+            # Fixed mtime and no embedded filename keep shard bytes reproducible
+            gz = gzip.GzipFile(filename='', fileobj=raw, mode='wb', compresslevel=9, mtime=0)
+            self._file = io.TextIOWrapper(gz, encoding='utf-8')
+            self._raw = raw
+        else:
+            path = SITEMAP_PATH
+            self._file = open(path, 'w', encoding='utf-8')
+        self.shard_paths.append(path)
+        self.shard_lastmods.append('')
+        self._urls = 0
+        self._bytes = 0
+        self._first_line = True
+        for line in SITEMAP_HEADER:
+            self._write_line(line)
+    
+    def _close_current(self):
+        if self._file is None:
+            return
+        self._write_line(SITEMAP_FOOTER)
+        self._file.close()
+        if self.sharded:
+            self._raw.close()
+        self._file = None
+    
+    def _write_line(self, line):
+        text = line if self._first_line else '\n' + line
+        self._first_line = False
+        self._file.write(text)
+        self._bytes += len(text.encode('utf-8'))
+    
+    def new_shard(self):
+        """Start a new shard before the next URL (no-op in single-file mode)"""
+        if self.sharded and self._file is not None and self._urls:
+            self._close_current()
+    
+    def comment(self, text):
+        if self._file is None:
+            self._open()
+        self._write_line(f'    <!-- {text} -->')
+    
+    def blank(self):
+        if self._file is None:
+            self._open()
+        self._write_line('')
+    
+    def add_url(self, loc, lastmod, changefreq, priority):
+        lines = [
+            '    <url>',
+            f'        <loc>{loc}</loc>',
+            f'        <lastmod>{lastmod}</lastmod>',
+            f'        <changefreq>{changefreq}</changefreq>',
+            f'        <priority>{priority}</priority>',
+            '    </url>'
+        ]
+        entry_bytes = sum(len(line.encode('utf-8')) + 1 for line in lines)
+        footer_bytes = len(SITEMAP_FOOTER) + 1
+        if self.sharded and self._file is not None and (
+                self._urls >= MAX_SITEMAP_URLS or
+                self._bytes + entry_bytes + footer_bytes > MAX_SITEMAP_BYTES):
+            self._close_current()
+        if self._file is None:
+            self._open()
+        for line in lines:
+            self._write_line(line)
+        self._urls += 1
+        self.shard_lastmods[-1] = max(self.shard_lastmods[-1], lastmod)
+    
+    def close(self):
+        """Finish the last file and, when sharded, write the sitemap index"""
+        self._close_current()
+        if self.sharded:
+            write_sitemap_index(zip(self.shard_paths, self.shard_lastmods))
+            remove_stale_shards(len(self.shard_paths))
+        return self.shard_paths
+
+def write_sitemap_index(shards):
+    """Write sitemap_index.xml pointing at every (shard path, newest lastmod in it)"""
+    with open(SITEMAP_INDEX_PATH, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        for path, lastmod in shards:
+            f.write('    <sitemap>\n')
+            f.write(f'        <loc>{SITE_URL}/{path}</loc>\n')
+            f.write(f'        <lastmod>{lastmod}</lastmod>\n')
+            f.write('    </sitemap>\n')
+        f.write('</sitemapindex>')
+
+def remove_stale_shards(shard_count):
+    """Delete shards left over from a previous build that produced more of them"""
+    for name in os.listdir('.'):
+        match = re.fullmatch(r'sitemap-(\d+)\.xml\.gz', name)
+        if match and int(match.group(1)) > shard_count:
+            os.remove(name)
+
+def page_file(path):
+    """Map a site URL path like /texas/austin/ to its generated index.html"""
+    return os.path.join(path.strip('/'), 'index.html') if path.strip('/') else 'index.html'
+
+def generate_complete_sitemap(sharded=False, shard_per_state=False, state_cities=None, slugs=None):
+    """Generate complete XML sitemap with all pages
+
+    With sharded=True the URLs are streamed into sitemap-N.xml.gz shards
+    referenced from sitemap_index.xml instead of a single sitemap.xml.
+    shard_per_state additionally starts a new shard for each state's cities.
+    state_cities and slugs default to the shared dataset.
+    """
+    
+    # Load shared dataset and organize data
+    if state_cities is None:
+        state_cities = group_cities_by_state(load_stores())
+    if slugs is None:
+        slugs = SlugRegistry(state_cities)
     
     # Current date for sitemap
     current_date = datetime.now().strftime('%Y-%m-%d')
     
-    # Start building XML
-    xml_content = ['<?xml version="1.0" encoding="UTF-8"?>']
-    xml_content.append('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">')
+    # Each URL's lastmod only moves when its generated page's content changes
+    lastmod_records = load_manifest(LASTMOD_PATH)
+    
+    def lastmod(path):
+        return content_lastmod(lastmod_records, page_file(path), current_date)
+    
+    writer = SitemapWriter(sharded=sharded)
     
     # Homepage
-    xml_content.append('    <!-- Homepage -->')
-    xml_content.append('    <url>')
-    xml_content.append('        <loc>https://www.consignmentstores.site/</loc>')
-    xml_content.append(f'        <lastmod>{current_date}</lastmod>')
-    xml_content.append('        <changefreq>daily</changefreq>')
-    xml_content.append('        <priority>1.0</priority>')
-    xml_content.append('    </url>')
-    xml_content.append('')
+    writer.comment('Homepage')
+    writer.add_url('https://www.consignmentstores.site/', lastmod('/'), 'daily', '1.0')
+    writer.blank()
     
     # About Page
-    xml_content.append('    <!-- About Page -->')
-    xml_content.append('    <url>')
-    xml_content.append('        <loc>https://www.consignmentstores.site/about/</loc>')
-    xml_content.append(f'        <lastmod>{current_date}</lastmod>')
-    xml_content.append('        <changefreq>monthly</changefreq>')
-    xml_content.append('        <priority>0.8</priority>')
-    xml_content.append('    </url>')
-    xml_content.append('')
+    writer.comment('About Page')
+    writer.add_url('https://www.consignmentstores.site/about/', lastmod('/about/'), 'monthly', '0.8')
+    writer.blank()
     
     # HTML Sitemap
-    xml_content.append('    <!-- HTML Sitemap -->')
-    xml_content.append('    <url>')
-    xml_content.append('        <loc>https://www.consignmentstores.site/sitemap/</loc>')
-    xml_content.append(f'        <lastmod>{current_date}</lastmod>')
-    xml_content.append('        <changefreq>weekly</changefreq>')
-    xml_content.append('        <priority>0.6</priority>')
-    xml_content.append('    </url>')
-    xml_content.append('')
+    writer.comment('HTML Sitemap')
+    writer.add_url('https://www.consignmentstores.site/sitemap/', lastmod('/sitemap/'), 'weekly', '0.6')
+    writer.blank()
     
     # State Pages
-    xml_content.append('    <!-- State Pages -->')
+    writer.comment('State Pages')
     states_list = list(state_cities.keys())
     states_list.sort()
     
     for state in states_list:
-        state_slug = state_slugs.get(state, slugify(state))
-        xml_content.append('    <url>')
-        xml_content.append(f'        <loc>https://www.consignmentstores.site/{state_slug}/</loc>')
-        xml_content.append(f'        <lastmod>{current_date}</lastmod>')
-        xml_content.append('        <changefreq>weekly</changefreq>')
-        xml_content.append('        <priority>0.9</priority>')
-        xml_content.append('    </url>')
+        state_slug = slugs.state_slug(state)
+        writer.add_url(f'https://www.consignmentstores.site/{state_slug}/', lastmod(f'/{state_slug}/'), 'weekly', '0.9')
     
-    xml_content.append('')
+    writer.blank()
     
     # City Pages
-    xml_content.append('    <!-- City Pages -->')
+    writer.comment('City Pages')
     total_cities = 0
     
     for state in states_list:
-        state_slug = state_slugs.get(state, slugify(state))
+        state_slug = slugs.state_slug(state)
         cities = sorted(list(state_cities[state]))
         
+        if shard_per_state:
+            writer.new_shard()
+        
         for city in cities:
-            city_slug = slugify(city)
-            xml_content.append('    <url>')
-            xml_content.append(f'        <loc>https://www.consignmentstores.site/{state_slug}/{city_slug}/</loc>')
-            xml_content.append(f'        <lastmod>{current_date}</lastmod>')
-            xml_content.append('        <changefreq>weekly</changefreq>')
-            xml_content.append('        <priority>0.8</priority>')
-            xml_content.append('    </url>')
+            city_slug = slugs.city_slug(state, city)
+            city_path = f'/{state_slug}/{city_slug}/'
+            writer.add_url(f'https://www.consignmentstores.site{city_path}', lastmod(city_path), 'weekly', '0.8')
             total_cities += 1
     
-    xml_content.append('</urlset>')
-    
-    # Write sitemap
-    sitemap_content = '\n'.join(xml_content)
-    
-    with open('sitemap.xml', 'w', encoding='utf-8') as f:
-        f.write(sitemap_content)
+    # Write sitemap (and the index when sharded)
+    shard_paths = writer.close()
+    save_manifest(lastmod_records, LASTMOD_PATH)
     
     print(f"Complete XML sitemap generated successfully!")
     print(f"Total pages in sitemap:")
@@ -133,6 +226,8 @@ def generate_complete_sitemap():
     print(f"  - {len(states_list)} State pages")
     print(f"  - {total_cities} City pages")
     print(f"  - TOTAL: {3 + len(states_list) + total_cities} pages")
+    if sharded:
+        print(f"Wrote {len(shard_paths)} gzip shards and {SITEMAP_INDEX_PATH}")
     
     # Also create a simplified version for testing
     with open('sitemap_summary.txt', 'w', encoding='utf-8') as f:
@@ -145,16 +240,16 @@ def generate_complete_sitemap():
         
         f.write(f"STATE PAGES ({len(states_list)} total):\n")
         for state in states_list:
-            state_slug = state_slugs.get(state, slugify(state))
+            state_slug = slugs.state_slug(state)
             f.write(f"- {state} (/{state_slug}/)\n")
         
         f.write(f"\nCITY PAGES ({total_cities} total):\n")
         for state in states_list[:5]:  # Show first 5 states as example
-            state_slug = state_slugs.get(state, slugify(state))
+            state_slug = slugs.state_slug(state)
             cities = sorted(list(state_cities[state]))
             f.write(f"\n{state} cities:\n")
             for city in cities[:10]:  # Show first 10 cities per state
-                city_slug = slugify(city)
+                city_slug = slugs.city_slug(state, city)
                 f.write(f"  - {city} (/{state_slug}/{city_slug}/)\n")
             if len(cities) > 10:
                 f.write(f"  ... and {len(cities) - 10} more cities\n")
@@ -163,4 +258,11 @@ def generate_complete_sitemap():
         f.write(f"\nTOTAL PAGES: {3 + len(states_list) + total_cities}\n")
 
 if __name__ == '__main__':
-    generate_complete_sitemap()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate the XML sitemap")
+    parser.add_argument('--sharded', action='store_true',
+                        help="write sitemap-N.xml.gz shards and sitemap_index.xml instead of sitemap.xml")
+    parser.add_argument('--shard-per-state', action='store_true',
+                        help="with --sharded, start a new shard for each state's city pages")
+    args = parser.parse_args()
+    
+    generate_complete_sitemap(sharded=args.sharded, shard_per_state=args.shard_per_state)
\ No newline at end of file
@@ -1,48 +1,16 @@
 #!/usr/bin/env python3
 
-import csv
-from collections import defaultdict
+from slugs import SlugRegistry
+from store_data import group_cities_by_state, load_stores
 
-def slugify(text):
-    """Convert text to URL-friendly slug"""
-    import re
-    text = text.lower()
-    text = re.sub(r'[^\w\s-]', '', text)
-    text = re.sub(r'[-\s]+', '-', text)
-    return text.strip('-')
-
-def generate_html_sitemap():
-    """Generate comprehensive HTML sitemap"""
-    
-    # State name to URL slug mapping
-    state_slugs = {
-        'Alabama': 'alabama', 'Alaska': 'alaska', 'Arizona': 'arizona', 'Arkansas': 'arkansas',
-        'California': 'california', 'Colorado': 'colorado', 'Connecticut': 'connecticut',
-        'Delaware': 'delaware', 'Florida': 'florida', 'Georgia': 'georgia', 'Hawaii': 'hawaii',
-        'Idaho': 'idaho', 'Illinois': 'illinois', 'Indiana': 'indiana', 'Iowa': 'iowa',
-        'Kansas': 'kansas', 'Kentucky': 'kentucky', 'Louisiana': 'louisiana', 'Maine': 'maine',
-        'Maryland': 'maryland', 'Massachusetts': 'massachusetts', 'Michigan': 'michigan',
-        'Minnesota': 'minnesota', 'Mississippi': 'mississippi', 'Missouri': 'missouri',
-        'Montana': 'montana', 'Nebraska': 'nebraska', 'Nevada': 'nevada', 'New Hampshire': 'new-hampshire',
-        'New Jersey': 'new-jersey', 'New Mexico': 'new-mexico', 'New York': 'new-york',
-        'North Carolina': 'north-carolina', 'North Dakota': 'north-dakota', 'Ohio': 'ohio',
-        'Oklahoma': 'oklahoma', 'Oregon': 'oregon', 'Pennsylvania': 'pennsylvania',
-        'Rhode Island': 'rhode-island', 'South Carolina': 'south-carolina', 'South Dakota': 'south-dakota',
-        'Tennessee': 'tennessee', 'Texas': 'texas', 'Utah': 'utah', 'Vermont': 'vermont',
-        'Virginia': 'virginia', 'Washington': 'washington', 'West Virginia': 'west-virginia',
-        'Wisconsin': 'wisconsin', 'Wyoming': 'wyoming', 'District of Columbia': 'district-of-columbia'
-    }
-    
-    # Read CSV and organize data
-    state_cities = defaultdict(set)
+def generate_html_sitemap(state_cities=None, slugs=None):
+    """Generate comprehensive HTML sitemap (from the shared dataset by default)"""
     
-    with open('consignment_stores.csv', 'r', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            state = row['State'].strip()
-            city = row['City'].strip()
-            if state and city:
-                state_cities[state].add(city)
+    # Load shared dataset and organize data
+    if state_cities is None:
+        state_cities = group_cities_by_state(load_stores())
+    if slugs is None:
+        slugs = SlugRegistry(state_cities)
     
     # Sort states alphabetically
     sorted_states = sorted(state_cities.keys())
@@ -72,7 +40,7 @@ def generate_html_sitemap():
                     <ul style="list-style: none; padding: 0; line-height: 1.8;">''')
         
         for state in group:
-            state_slug = state_slugs.get(state, slugify(state))
+            state_slug = slugs.state_slug(state)
             city_count = len(state_cities[state])
             states_html.append(f'                        <li><a href="/{state_slug}/">{state}</a> <span style="color: var(--dark-gray); font-size: 12px;">({city_count} cities)</span></li>')
         
@@ -86,7 +54,7 @@ def generate_html_sitemap():
     top_states = sorted(state_cities.items(), key=lambda x: len(x[1]), reverse=True)[:6]
     
     for state, cities in top_states:
-        state_slug = state_slugs.get(state, slugify(state))
+        state_slug = slugs.state_slug(state)
         # Take first 5 cities alphabetically for each state
         popular_cities_by_state[state] = {
             'slug': state_slug,
@@ -101,7 +69,7 @@ def generate_html_sitemap():
                         <ul style="list-style: none; padding: 0; line-height: 1.6;">''')
         
         for city in data['cities']:
-            city_slug = slugify(city)
+            city_slug = slugs.city_slug(state, city)
             popular_cities_html.append(f'                            <li><a href="/{data["slug"]}/{city_slug}/">{city} Consignment Stores</a></li>')
         
         if len(state_cities[state]) > 5:
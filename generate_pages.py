@@ -3,138 +3,193 @@
 Generate consignment store directory pages from CSV data
 """
 
+import argparse
+import numpy as np
 import pandas as pd
 import os
-import re
-from collections import defaultdict, Counter
+import tempfile
+import time
+from collections import defaultdict
 import html
-import math
 
-def slugify(text):
-    """Convert text to URL-friendly slug"""
-    if pd.isna(text) or text == '':
-        return ''
-    text = str(text).lower()
-    text = re.sub(r'[^\w\s-]', '', text)
-    text = re.sub(r'[-\s]+', '-', text)
-    return text.strip('-')
+from geo_index import build_city_index, nearest_cities
+from slugs import SlugRegistry
+from store_cards import FEATURE_TAGS, generate_store_card_html, write_homepage
+from store_data import CSV_PATH, load_stores, store_to_row
+from synthetic_data import write_synthetic_csv
+from template_engine import load_template, render_template
 
-def format_phone(phone):
-    """Format phone number for display"""
-    if pd.isna(phone) or phone == '' or phone == 'No data available':
-        return None
-    phone = str(phone).strip()
-    if phone.startswith('+1'):
-        phone = phone[2:].strip()
-    # Format as (XXX) XXX-XXXX
-    digits = re.sub(r'\D', '', phone)
-    if len(digits) == 10:
-        return f"({digits[:3]}) {digits[3:6]}-{digits[6:]}"
-    return phone
+STATE_TEMPLATE_PATH = 'templates/state-template.html'
+CITY_TEMPLATE_PATH = 'templates/city-template.html'
 
-def format_website(site):
-    """Format website URL"""
-    if pd.isna(site) or site == '' or site == 'No data available':
-        return None
-    site = str(site).strip()
-    if not site.startswith('http'):
-        site = 'https://' + site
-    return site
+# Seconds between polls of the CSV and templates in --watch mode
+WATCH_INTERVAL = 0.5
 
-def get_store_features(row):
-    """Extract store features as tags"""
-    features = []
-    feature_mapping = {
-        'pricing': {'Low': 'Affordable Pricing', 'Mid-Range': 'Fair Pricing'},
-        'wide_selection': {'Yes': 'Wide Selection'},
-        'sell_antiques': {'Yes': 'Antiques'},
-        'sell_books': {'Yes': 'Books'},
-        'clean_organized': {'Yes': 'Clean & Organized'},
-        'sell_clothes': {'Yes': 'Clothing'},
-        'sell_furniture': {'Yes': 'Furniture'},
-        'sell_jewelry': {'Yes': 'Jewelry'},
-        'sell_gift_items': {'Yes': 'Gift Items'},
-        'sell_premium_brand': {'Yes': 'Premium Brands'},
-        'friendly_employees': {'Yes': 'Friendly Staff'}
-    }
-    
-    for col, mapping in feature_mapping.items():
-        value = str(row.get(col, '')).strip()
-        if value in mapping:
-            features.append(mapping[value])
-    
-    return features
+# Placeholders each template is expected to contain, checked when it is compiled
+STATE_TEMPLATE_SLOTS = [
+    'STATE_NAME', 'STATE_SLUG', 'STORE_COUNT',
+    'FEATURED_STORES_LIST', 'ALL_CITIES_LIST', 'POPULAR_CITIES_DROPDOWN'
+]
 
-def generate_store_card_html(store):
-    """Generate HTML for a single store card"""
-    name = html.escape(str(store['Business Name']))
-    address = html.escape(str(store['Address']))
-    reviews = store.get('Number of Reviews', 0)
-    phone = format_phone(store.get('Phone'))
-    website = format_website(store.get('Site'))
-    photo = store.get('Photo', '')
-    features = get_store_features(store)
-    
-    # Generate star rating based on review count (simplified)
-    if reviews > 200:
-        stars = "★★★★★"
-    elif reviews > 100:
-        stars = "★★★★☆"
-    elif reviews > 50:
-        stars = "★★★☆☆"
-    elif reviews > 20:
-        stars = "★★☆☆☆"
-    else:
-        stars = "★☆☆☆☆"
-    
-    feature_tags = ''.join([f'<span class="feature-tag">{feature}</span>' for feature in features[:4]])
-    
-    contact_links = []
-    if phone:
-        contact_links.append(f'<a href="tel:{phone.replace("(", "").replace(")", "").replace("-", "").replace(" ", "")}" class="contact-link">📞 Call</a>')
-    if website:
-        contact_links.append(f'<a href="{website}" class="contact-link" target="_blank">🌐 Website</a>')
-    
-    contact_html = '<div class="store-contact">' + ''.join(contact_links) + '</div>' if contact_links else ''
-    
-    return f'''
-        <div class="store-card">
-            <h3 class="store-name">{name}</h3>
-            <p class="store-address">{address}</p>
-            <p class="store-reviews">{stars} ({reviews} reviews)</p>
-            <div class="store-features">
-                {feature_tags}
-            </div>
-            {contact_html}
-        </div>
-    '''
+CITY_TEMPLATE_SLOTS = [
+    'CITY_NAME', 'STATE_NAME', 'CITY_SLUG', 'STATE_SLUG', 'STORE_COUNT',
+    'STORE_LISTINGS', 'NEARBY_CITIES_LIST', 'AVG_REVIEWS', 'TOP_CATEGORY', 'MOST_REVIEWED_STORE',
+    'CLOTHING_COUNT', 'FURNITURE_COUNT', 'ANTIQUES_COUNT', 'BOOKS_COUNT', 'JEWELRY_COUNT',
+    'AFFORDABLE_COUNT', 'WIDE_SELECTION_COUNT', 'CLEAN_COUNT', 'FRIENDLY_COUNT', 'PREMIUM_COUNT',
+    'STORES_JSON_LD'
+]
 
-def calculate_distance(lat1, lon1, lat2, lon2):
-    """Calculate approximate distance between two points (simplified)"""
-    # For now, just use a simple coordinate difference
-    # In production, you'd use proper geolocation calculation
-    return abs(lat1 - lat2) + abs(lon1 - lon2)
+FEATURE_TAG_BITS = np.array([bit for bit, _ in FEATURE_TAGS], dtype=np.uint16)
 
-def get_nearby_cities(target_city, target_state, all_cities_data, limit=10):
-    """Get nearby cities with stores (simplified by alphabetical proximity)"""
-    state_cities = all_cities_data.get(target_state, {})
+def count_feature_tags(masks):
+    """Count stores carrying each feature tag in one vectorized pass over uint16 masks
+
+    Returns a tag -> count dict and the most common tag, with ties going to
+    the tag seen first (store order, then tag order) as Counter.most_common did.
+    """
+    present = (masks[:, None] & FEATURE_TAG_BITS) != 0
+    counts = present.sum(axis=0)
+    tag_counts = {tag: int(count) for (_, tag), count in zip(FEATURE_TAGS, counts)}
+    
+    if not counts.any():
+        return tag_counts, 'General'
     
-    # Simple approach: get cities in same state, sorted alphabetically
+    first_seen = present.argmax(axis=0)
+    top = max(range(len(FEATURE_TAGS)), key=lambda i: (counts[i], -first_seen[i], -i))
+    return tag_counts, FEATURE_TAGS[top][1]
+
+def get_nearby_cities(target_city, target_state, all_cities_data, city_locations, city_tree, slugs, limit=10):
+    """Get the nearest cities with stores by distance, including across state lines"""
     nearby = []
+    for (state, city), miles in nearest_cities((target_state, target_city), city_locations, city_tree, limit):
+        count = all_cities_data[state][city]
+        label = city if state == target_state else f"{city}, {state}"
+        nearby.append(f'<li><a href="/{slugs.state_slug(state)}/{slugs.city_slug(state, city)}/">{label} ({count} stores, {miles:.0f} mi)</a></li>')
+    if nearby:
+        return '\n'.join(nearby)
+    
+    # No ZIP could be resolved for this city: fall back to alphabetical neighbours in the same state
+    state_cities = all_cities_data.get(target_state, {})
     for city, count in sorted(state_cities.items()):
         if city.lower() != target_city.lower():
-            city_slug = slugify(city)
-            state_slug = slugify(target_state)
+            city_slug = slugs.city_slug(target_state, city)
+            state_slug = slugs.state_slug(target_state)
             nearby.append(f'<li><a href="/{state_slug}/{city_slug}/">{city} ({count} stores)</a></li>')
             if len(nearby) >= limit:
                 break
     
     return '\n'.join(nearby)
 
-def main():
+class RowView:
+    """Read-only view of one DataFrame row, backed by shared column lists"""
+    
+    __slots__ = ('_columns', '_index')
+    
+    def __init__(self, columns, index):
+        self._columns = columns
+        self._index = index
+    
+    def __getitem__(self, key):
+        return self._columns[key][self._index]
+    
+    def get(self, key, default=None):
+        column = self._columns.get(key)
+        return default if column is None else column[self._index]
+
+def row_views(columns, rows):
+    """Wrap an array of row positions as RowViews"""
+    return [RowView(columns, index) for index in rows.tolist()]
+
+def split_rows(rows, keys):
+    """Split row positions into {key: positions with that key}, keeping their order"""
+    codes, uniques = pd.factorize(keys)
+    grouped = rows[np.argsort(codes, kind='stable')]
+    bounds = np.flatnonzero(np.diff(np.sort(codes))) + 1
+    return dict(zip(uniques.tolist(), np.split(grouped, bounds)))
+
+def rank_rows(df, reviews):
+    """Rank every row by review count once and split the ranking by state and city
+    
+    Returns (global order, {state: positions}, {state: {city: positions}}),
+    every array in review order, descending, ties in CSV order, so featured
+    stores are a prefix rather than a per-page sort.
+    """
+    states = df['State'].astype(str).str.strip().to_numpy()
+    cities = df['City'].astype(str).str.strip().to_numpy()
+    
+    order = np.argsort(-reviews, kind='stable')
+    ranked_states = split_rows(order, states[order])
+    ranked_cities = {state: split_rows(rows, cities[rows]) for state, rows in ranked_states.items()}
+    return order, ranked_states, ranked_cities
+
+def group_rows(df):
+    """Group row positions by state and city without iterating rows
+    
+    Returns {state: {city: array of row positions}}. States, cities within
+    a state and rows within a city all keep first-seen order, matching the
+    previous iterrows grouping.
+    """
+    states = df['State'].astype(str).str.strip().to_numpy()
+    cities = df['City'].astype(str).str.strip().to_numpy()
+    
+    # Codes are assigned in first-seen order; city codes are per (state, city) pair
+    state_codes, _ = pd.factorize(states)
+    city_codes, _ = pd.factorize(pd.Series(states) + '\x1f' + pd.Series(cities))
+    
+    # Stable sort by state then city, then find group starts from the combined key
+    order = np.lexsort((city_codes, state_codes))
+    keys = state_codes[order].astype(np.int64) * (int(city_codes.max()) + 1) + city_codes[order]
+    _, starts = np.unique(keys, return_index=True)
+    ends = np.append(starts[1:], len(order))
+    
+    grouped = defaultdict(dict)
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        first = order[start]
+        grouped[states[first]][cities[first]] = order[start:end]
+    return grouped
+
+def group_rows_iterrows(df):
+    """The previous iterrows grouping, kept for benchmarking"""
+    states_data = defaultdict(lambda: defaultdict(list))
+    for _, store in df.iterrows():
+        state = str(store['State']).strip()
+        city = str(store['City']).strip()
+        states_data[state][city].append(store)
+    return states_data
+
+def benchmark_grouping(n_rows):
+    """Time iterrows grouping against group_rows on a synthetic CSV"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, 'stores.csv')
+        print(f"Writing {n_rows:,} synthetic stores...")
+        write_synthetic_csv(csv_path, n_rows)
+        df = pd.read_csv(csv_path, keep_default_na=False)
+    
+    start = time.perf_counter()
+    grouped = group_rows(df)
+    columns = {col: df[col].tolist() for col in df.columns}
+    views = sum(len(row_views(columns, rows)) for cities in grouped.values() for rows in cities.values())
+    columnar_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    old_grouped = group_rows_iterrows(df)
+    iterrows_time = time.perf_counter() - start
+    
+    assert views == n_rows
+    assert [(state, list(cities)) for state, cities in grouped.items()] == \
+        [(state, list(cities)) for state, cities in old_grouped.items()]
+    
+    city_count = sum(len(cities) for cities in grouped.values())
+    print(f"Grouped {n_rows:,} rows into {len(grouped)} states and {city_count:,} cities")
+    print(f"  iterrows grouping: {iterrows_time:.2f} s")
+    print(f"  columnar grouping: {columnar_time:.2f} s (including row views)")
+    print(f"  Speedup:           {iterrows_time / columnar_time:.1f}x")
+
+def load_frame(csv_path=CSV_PATH, use_cache=True):
+    """Load the shared dataset into a DataFrame keyed by CSV column names, without rows missing a state or city"""
     # Load the data
     print("Loading data...")
-    df = pd.read_csv('consignment_stores.csv')
+    df = pd.DataFrame.from_records([store_to_row(store, feature_mask=True) for store in load_stores(csv_path, use_cache)])
     print(f"Loaded {len(df)} stores")
     
     # Clean and organize data
@@ -145,16 +200,20 @@ def main():
     # Remove invalid entries
     df = df[(df['State'] != 'Unknown') & (df['City'] != 'Unknown')]
     print(f"After cleaning: {len(df)} stores")
-    
-    # Group data by state and city
-    states_data = defaultdict(lambda: defaultdict(list))
+    return df
+
+def prepare_pages(df):
+    """Group rows and build the lookups, slugs and templates every page needs"""
+    # Group row positions by state and city
+    states_data = group_rows(df)
     cities_count_by_state = defaultdict(dict)
     
-    for _, store in df.iterrows():
-        state = str(store['State']).strip()
-        city = str(store['City']).strip()
-        states_data[state][city].append(store)
-        
+    # Columns shared by every row view, plus numeric arrays for ranking and counts
+    columns = {col: df[col].tolist() for col in df.columns}
+    reviews = df['Number of Reviews'].to_numpy()
+    feature_masks = df['feature_mask'].to_numpy(dtype=np.uint16)
+    review_order, ranked_states, ranked_cities = rank_rows(df, reviews)
+    
     # Count stores by city for each state
     for state, cities in states_data.items():
         for city, stores in cities.items():
@@ -162,214 +221,341 @@ def main():
     
     print(f"Processing {len(states_data)} states...")
     
-    # Load templates
-    with open('templates/state-template.html', 'r', encoding='utf-8') as f:
-        state_template = f.read()
+    # Locate every city from its stores' ZIP codes for nearest-city lookups
+    addresses = columns['Address']
+    city_locations, city_tree = build_city_index({
+        (state, city): [addresses[i] for i in rows.tolist()]
+        for state, cities in states_data.items()
+        for city, rows in cities.items()
+    })
+    total_cities = sum(len(cities) for cities in states_data.values())
+    print(f"Located {len(city_locations)} of {total_cities} cities")
     
-    with open('templates/city-template.html', 'r', encoding='utf-8') as f:
-        city_template = f.read()
+    # Slugs for every page, with colliding city names given distinct slugs
+    slugs = SlugRegistry({state: cities.keys() for state, cities in states_data.items()})
+    slugs.report_collisions()
     
-    # Generate state pages
-    print("Generating state pages...")
-    for state, cities in states_data.items():
-        state_slug = slugify(state)
-        state_dir = state_slug
-        
-        # Create state directory
-        os.makedirs(state_dir, exist_ok=True)
-        
-        # Calculate state statistics
-        total_stores = sum(len(stores) for stores in cities.values())
-        all_stores = []
-        for city_stores in cities.values():
-            all_stores.extend(city_stores)
-        
-        # Sort stores by review count
-        all_stores.sort(key=lambda x: x.get('Number of Reviews', 0), reverse=True)
-        featured_stores = all_stores[:8]  # Top 8 stores for state page
-        
-        # Generate featured stores HTML
-        featured_stores_html = '\n'.join([generate_store_card_html(store) for store in featured_stores])
-        
-        # Generate all cities list
-        sorted_cities = sorted(cities.items(), key=lambda x: len(x[1]), reverse=True)
-        all_cities_html = '\n'.join([
-            f'<li><a href="/{state_slug}/{slugify(city)}/">{city} ({len(stores)} stores)</a></li>'
-            for city, stores in sorted_cities[:20]  # Top 20 cities
-        ])
-        
-        # Generate popular cities for dropdown
-        popular_cities_html = '\n'.join([
-            f'<a href="/{state_slug}/{slugify(city)}/" class="dropdown-link">{city}, {state[:2].upper()}</a>'
-            for city, stores in sorted_cities[:10]
-        ])
-        
-        # Replace template variables
-        state_page = state_template.replace('{{STATE_NAME}}', state)
-        state_page = state_page.replace('{{STATE_SLUG}}', state_slug)
-        state_page = state_page.replace('{{STORE_COUNT}}', str(total_stores))
-        state_page = state_page.replace('{{FEATURED_STORES_LIST}}', featured_stores_html)
-        state_page = state_page.replace('{{ALL_CITIES_LIST}}', all_cities_html)
-        state_page = state_page.replace('{{POPULAR_CITIES_DROPDOWN}}', popular_cities_html)
-        
-        # Write state page
-        with open(f'{state_dir}/index.html', 'w', encoding='utf-8') as f:
-            f.write(state_page)
+    # Load and compile templates
+    state_template = load_template(STATE_TEMPLATE_PATH, STATE_TEMPLATE_SLOTS)
+    city_template = load_template(CITY_TEMPLATE_PATH, CITY_TEMPLATE_SLOTS)
+    
+    return {
+        'states_data': states_data,
+        'cities_count_by_state': cities_count_by_state,
+        'columns': columns,
+        'reviews': reviews,
+        'feature_masks': feature_masks,
+        'review_order': review_order,
+        'ranked_states': ranked_states,
+        'ranked_cities': ranked_cities,
+        'city_locations': city_locations,
+        'city_tree': city_tree,
+        'slugs': slugs,
+        'state_template': state_template,
+        'city_template': city_template
+    }
+
+def render_state_page(context, state):
+    """Render one state page, returning (page directory, page HTML, log line)"""
+    cities = context['states_data'][state]
+    columns = context['columns']
+    slugs = context['slugs']
+    state_template = context['state_template']
+    
+    state_slug = slugs.state_slug(state)
+    
+    # Calculate state statistics
+    total_stores = sum(len(rows) for rows in cities.values())
+    
+    # The state's rows in review order
+    state_rows = context['ranked_states'][state]
+    featured_stores = row_views(columns, state_rows[:8])  # Top 8 stores for state page
+    
+    # Generate featured stores HTML
+    featured_stores_html = '\n'.join([generate_store_card_html(store) for store in featured_stores])
+    
+    # Generate all cities list
+    sorted_cities = sorted(cities.items(), key=lambda x: len(x[1]), reverse=True)
+    all_cities_html = '\n'.join([
+        f'<li><a href="/{state_slug}/{slugs.city_slug(state, city)}/">{city} ({len(stores)} stores)</a></li>'
+        for city, stores in sorted_cities[:20]  # Top 20 cities
+    ])
+    
+    # Generate popular cities for dropdown
+    popular_cities_html = '\n'.join([
+        f'<a href="/{state_slug}/{slugs.city_slug(state, city)}/" class="dropdown-link">{city}, {state[:2].upper()}</a>'
+        for city, stores in sorted_cities[:10]
+    ])
+    
+    # Fill template slots
+    state_page = render_template(state_template, {
+        'STATE_NAME': state,
+        'STATE_SLUG': state_slug,
+        'STORE_COUNT': str(total_stores),
+        'FEATURED_STORES_LIST': featured_stores_html,
+        'ALL_CITIES_LIST': all_cities_html,
+        'POPULAR_CITIES_DROPDOWN': popular_cities_html
+    })
+    
+    return state_slug, state_page, f"Generated {state} state page ({total_stores} stores)"
+
+def render_city_page(context, state, city):
+    """Render one city page, returning (page directory, page HTML, log line)"""
+    city_rows = context['states_data'][state][city]
+    cities_count_by_state = context['cities_count_by_state']
+    columns = context['columns']
+    reviews = context['reviews']
+    feature_masks = context['feature_masks']
+    city_locations = context['city_locations']
+    city_tree = context['city_tree']
+    slugs = context['slugs']
+    city_template = context['city_template']
+    
+    state_slug = slugs.state_slug(state)
+    city_slug = slugs.city_slug(state, city)
+    
+    # City stores in review order
+    sorted_stores = row_views(columns, context['ranked_cities'][state][city])
+    
+    # Generate store listings HTML
+    store_listings_html = '\n'.join([generate_store_card_html(store) for store in sorted_stores])
+    
+    # Calculate city statistics
+    city_reviews = reviews[city_rows]
+    total_reviews = int(city_reviews.sum())
+    avg_reviews = int(total_reviews / len(city_rows)) if len(city_rows) else 0
+    
+    # Count categories and features from the store bitmasks
+    tag_counts, top_category = count_feature_tags(feature_masks[city_rows])
+    
+    # Get most reviewed store (first one on ties)
+    most_reviewed = RowView(columns, city_rows[city_reviews.argmax()])
+    most_reviewed_name = most_reviewed.get('Business Name', 'N/A')
+    
+    # Generate nearby cities
+    nearby_cities_html = get_nearby_cities(city, state, cities_count_by_state, city_locations, city_tree, slugs)
+    
+    city_values = {
+        'CITY_NAME': city,
+        'STATE_NAME': state,
+        'CITY_SLUG': city_slug,
+        'STATE_SLUG': state_slug,
+        'STORE_COUNT': str(len(city_rows)),
+        'STORE_LISTINGS': store_listings_html,
+        'NEARBY_CITIES_LIST': nearby_cities_html,
+        'AVG_REVIEWS': str(avg_reviews),
+        'TOP_CATEGORY': top_category,
+        'MOST_REVIEWED_STORE': most_reviewed_name,
         
-        print(f"Generated {state} state page ({total_stores} stores)")
+        # Category counts
+        'CLOTHING_COUNT': str(tag_counts['Clothing']),
+        'FURNITURE_COUNT': str(tag_counts['Furniture']),
+        'ANTIQUES_COUNT': str(tag_counts['Antiques']),
+        'BOOKS_COUNT': str(tag_counts['Books']),
+        'JEWELRY_COUNT': str(tag_counts['Jewelry']),
         
-        # Generate city pages for this state
-        for city, city_stores in cities.items():
-            city_slug = slugify(city)
-            city_dir = f'{state_slug}/{city_slug}'
-            
-            # Create city directory
-            os.makedirs(city_dir, exist_ok=True)
-            
-            # Sort city stores by review count
-            sorted_stores = sorted(city_stores, key=lambda x: x.get('Number of Reviews', 0), reverse=True)
-            
-            # Generate store listings HTML
-            store_listings_html = '\n'.join([generate_store_card_html(store) for store in sorted_stores])
-            
-            # Calculate city statistics
-            total_reviews = sum(store.get('Number of Reviews', 0) for store in city_stores)
-            avg_reviews = int(total_reviews / len(city_stores)) if city_stores else 0
-            
-            # Count features
-            feature_counts = Counter()
-            for store in city_stores:
-                features = get_store_features(store)
-                feature_counts.update(features)
-            
-            # Get top category
-            top_category = feature_counts.most_common(1)[0][0] if feature_counts else 'General'
-            
-            # Get most reviewed store
-            most_reviewed = max(city_stores, key=lambda x: x.get('Number of Reviews', 0))
-            most_reviewed_name = most_reviewed.get('Business Name', 'N/A')
-            
-            # Generate nearby cities
-            nearby_cities_html = get_nearby_cities(city, state, cities_count_by_state)
-            
-            # Count stores by category (simplified)
-            clothing_count = sum(1 for store in city_stores if get_store_features(store) and 'Clothing' in get_store_features(store))
-            furniture_count = sum(1 for store in city_stores if get_store_features(store) and 'Furniture' in get_store_features(store))
-            antiques_count = sum(1 for store in city_stores if get_store_features(store) and 'Antiques' in get_store_features(store))
-            books_count = sum(1 for store in city_stores if get_store_features(store) and 'Books' in get_store_features(store))
-            jewelry_count = sum(1 for store in city_stores if get_store_features(store) and 'Jewelry' in get_store_features(store))
-            
-            # Count features
-            affordable_count = sum(1 for store in city_stores if 'Affordable Pricing' in get_store_features(store))
-            wide_selection_count = sum(1 for store in city_stores if 'Wide Selection' in get_store_features(store))
-            clean_count = sum(1 for store in city_stores if 'Clean & Organized' in get_store_features(store))
-            friendly_count = sum(1 for store in city_stores if 'Friendly Staff' in get_store_features(store))
-            premium_count = sum(1 for store in city_stores if 'Premium Brands' in get_store_features(store))
-            
-            # Replace template variables
-            city_page = city_template.replace('{{CITY_NAME}}', city)
-            city_page = city_page.replace('{{STATE_NAME}}', state)
-            city_page = city_page.replace('{{CITY_SLUG}}', city_slug)
-            city_page = city_page.replace('{{STATE_SLUG}}', state_slug)
-            city_page = city_page.replace('{{STORE_COUNT}}', str(len(city_stores)))
-            city_page = city_page.replace('{{STORE_LISTINGS}}', store_listings_html)
-            city_page = city_page.replace('{{NEARBY_CITIES_LIST}}', nearby_cities_html)
-            city_page = city_page.replace('{{AVG_REVIEWS}}', str(avg_reviews))
-            city_page = city_page.replace('{{TOP_CATEGORY}}', top_category)
-            city_page = city_page.replace('{{MOST_REVIEWED_STORE}}', most_reviewed_name)
-            
-            # Replace category counts
-            city_page = city_page.replace('{{CLOTHING_COUNT}}', str(clothing_count))
-            city_page = city_page.replace('{{FURNITURE_COUNT}}', str(furniture_count))
-            city_page = city_page.replace('{{ANTIQUES_COUNT}}', str(antiques_count))
-            city_page = city_page.replace('{{BOOKS_COUNT}}', str(books_count))
-            city_page = city_page.replace('{{JEWELRY_COUNT}}', str(jewelry_count))
-            
-            # Replace feature counts
-            city_page = city_page.replace('{{AFFORDABLE_COUNT}}', str(affordable_count))
-            city_page = city_page.replace('{{WIDE_SELECTION_COUNT}}', str(wide_selection_count))
-            city_page = city_page.replace('{{CLEAN_COUNT}}', str(clean_count))
-            city_page = city_page.replace('{{FRIENDLY_COUNT}}', str(friendly_count))
-            city_page = city_page.replace('{{PREMIUM_COUNT}}', str(premium_count))
-            
-            # Generate JSON-LD for stores
-            stores_jsonld = []
-            for i, store in enumerate(sorted_stores[:5]):  # Top 5 stores
-                store_json = f'''{{
+        # Feature counts
+        'AFFORDABLE_COUNT': str(tag_counts['Affordable Pricing']),
+        'WIDE_SELECTION_COUNT': str(tag_counts['Wide Selection']),
+        'CLEAN_COUNT': str(tag_counts['Clean & Organized']),
+        'FRIENDLY_COUNT': str(tag_counts['Friendly Staff']),
+        'PREMIUM_COUNT': str(tag_counts['Premium Brands'])
+    }
+    
+    # Generate JSON-LD for stores
+    stores_jsonld = []
+    for i, store in enumerate(sorted_stores[:5]):  # Top 5 stores
+        store_json = f'''{{
                     "@type": "LocalBusiness",
                     "position": {i+1},
                     "name": "{html.escape(str(store['Business Name']))}",
                     "address": "{html.escape(str(store['Address']))}"
                 }}'''
-                stores_jsonld.append(store_json)
-            
-            city_page = city_page.replace('{{STORES_JSON_LD}}', ',\n                '.join(stores_jsonld))
-            
-            # Write city page
-            with open(f'{city_dir}/index.html', 'w', encoding='utf-8') as f:
-                f.write(city_page)
-            
-            print(f"Generated {city}, {state} city page ({len(city_stores)} stores)")
+        stores_jsonld.append(store_json)
+    
+    city_values['STORES_JSON_LD'] = ',\n                '.join(stores_jsonld)
+    
+    # Fill template slots
+    city_page = render_template(city_template, city_values)
+    
+    return f'{state_slug}/{city_slug}', city_page, f"Generated {city}, {state} city page ({len(city_rows)} stores)"
+
+def iter_pages(context):
+    """Render each state page followed by its city pages
+    
+    Yields (page directory, page HTML, log line); the caller writes the files.
+    """
+    # Generate state pages
+    print("Generating state pages...")
+    for state, cities in context['states_data'].items():
+        yield render_state_page(context, state)
+        
+        # Generate city pages for this state
+        for city in cities:
+            yield render_city_page(context, state, city)
+
+def write_generated_page(page_dir, page):
+    """Write one rendered page to page_dir/index.html, returning its size in bytes"""
+    os.makedirs(page_dir, exist_ok=True)
+    out_path = f'{page_dir}/index.html'
+    with open(out_path, 'w', encoding='utf-8') as f:
+        f.write(page)
+    return os.path.getsize(out_path)
+
+def main():
+    df = load_frame()
+    context = prepare_pages(df)
+    states_data = context['states_data']
+    
+    for page_dir, page, message in iter_pages(context):
+        write_generated_page(page_dir, page)
+        print(message)
     
     # Update homepage with real data
     print("Updating homepage with real data...")
-    update_homepage(df, states_data)
+    update_homepage(df, states_data, context['review_order'])
     
+    total_cities = sum(len(cities) for cities in states_data.values())
     print("Page generation complete!")
     print(f"Generated pages for {len(states_data)} states")
-    total_cities = sum(len(cities) for cities in states_data.values())
     print(f"Generated pages for {total_cities} cities")
 
-def update_homepage(df, states_data):
+def city_inputs(context):
+    """{(state, city): tuple of its rows' values}, for comparing two loads of the dataset"""
+    columns = context['columns']
+    names = list(columns)
+    return {
+        (state, city): tuple(tuple(columns[name][i] for name in names) for i in rows.tolist())
+        for state, cities in context['states_data'].items()
+        for city, rows in cities.items()
+    }
+
+def changed_pages(old_context, context):
+    """Return (states, (state, city) pairs) whose pages differ between two loads of the dataset
+    
+    Cities whose rows changed are re-rendered along with their state page.
+    Other cities are only re-rendered when their slug moved or their nearby
+    cities list renders differently, e.g. a neighbour's store count changed.
+    """
+    old_inputs = city_inputs(old_context)
+    new_inputs = city_inputs(context)
+    changed = {key for key in old_inputs.keys() | new_inputs.keys() if old_inputs.get(key) != new_inputs.get(key)}
+    old_slugs = old_context['slugs']
+    slugs = context['slugs']
+    
+    states = {state for state, _ in changed}
+    cities = {key for key in changed if key in new_inputs}
+    for state, city in new_inputs:
+        if old_slugs.city_slugs.get((state, city)) != slugs.city_slug(state, city):
+            states.add(state)
+            cities.add((state, city))
+    
+    if changed:
+        for state, city in new_inputs.keys() - cities:
+            old_nearby = get_nearby_cities(city, state, old_context['cities_count_by_state'], old_context['city_locations'],
+                                           old_context['city_tree'], old_slugs)
+            new_nearby = get_nearby_cities(city, state, context['cities_count_by_state'], context['city_locations'],
+                                           context['city_tree'], slugs)
+            if old_nearby != new_nearby:
+                cities.add((state, city))
+    
+    return sorted(state for state in states if state in context['states_data']), sorted(cities)
+
+def input_stamp(path):
+    """(mtime in ns, size) of a watched input, or None while it is missing"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def watch(csv_path=CSV_PATH, interval=WATCH_INTERVAL):
+    """Generate every page, then re-render affected pages whenever the CSV or a template changes
+    
+    The dataset and compiled templates stay in memory between changes. A
+    template edit re-renders every page of that type; a CSV edit re-renders
+    the pages changed_pages finds. Runs until interrupted.
+    """
+    start = time.perf_counter()
+    context = prepare_pages(load_frame(csv_path))
+    pages = 0
+    for page_dir, page, _ in iter_pages(context):
+        write_generated_page(page_dir, page)
+        pages += 1
+    print(f"Generated {pages} pages in {time.perf_counter() - start:.2f} s")
+    
+    stamps = {path: input_stamp(path) for path in (csv_path, STATE_TEMPLATE_PATH, CITY_TEMPLATE_PATH)}
+    print(f"Watching {', '.join(stamps)} for changes (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(interval)
+            changed = [path for path in stamps if input_stamp(path) != stamps[path]]
+            if not changed:
+                continue
+            for path in changed:
+                stamps[path] = input_stamp(path)
+            
+            start = time.perf_counter()
+            try:
+                states, cities = set(), set()
+                if csv_path in changed:
+                    new_context = prepare_pages(load_frame(csv_path))
+                    changed_states, changed_cities = changed_pages(context, new_context)
+                    context = new_context
+                    states.update(changed_states)
+                    cities.update(changed_cities)
+                if STATE_TEMPLATE_PATH in changed:
+                    context['state_template'] = load_template(STATE_TEMPLATE_PATH, STATE_TEMPLATE_SLOTS)
+                    states.update(context['states_data'])
+                if CITY_TEMPLATE_PATH in changed:
+                    context['city_template'] = load_template(CITY_TEMPLATE_PATH, CITY_TEMPLATE_SLOTS)
+                    cities.update((state, city) for state, state_cities in context['states_data'].items()
+                                  for city in state_cities)
+                
+                for state in sorted(states):
+                    write_generated_page(*render_state_page(context, state)[:2])
+                for state, city in sorted(cities):
+                    write_generated_page(*render_city_page(context, state, city)[:2])
+            except (OSError, ValueError) as e:
+                # Keep the last good dataset and templates, e.g. while a template is half edited
+                print(f"Rebuild failed, keeping previous output: {e}")
+                continue
+            
+            elapsed = time.perf_counter() - start
+            edited = max(stamp[0] for stamp in (stamps[path] for path in changed) if stamp)
+            since_edit = (time.time_ns() - edited) / 1e6
+            print(f"{', '.join(changed)} changed: re-rendered {len(states)} state and {len(cities)} city pages "
+                  f"in {elapsed * 1000:.0f} ms ({since_edit:.0f} ms after the edit)")
+    except KeyboardInterrupt:
+        print("Stopped watching")
+
+def update_homepage(df, states_data, review_order=None):
     """Update homepage with real featured stores"""
     
-    # Get top stores across all states
-    all_stores = df.sort_values('Number of Reviews', ascending=False)
-    featured_stores = all_stores.head(6)  # Top 6 stores for homepage
-    
-    featured_stores_html = '\n'.join([generate_store_card_html(store) for _, store in featured_stores.iterrows()])
-    
-    # Read current homepage
-    with open('index.html', 'r', encoding='utf-8') as f:
-        homepage = f.read()
-    
-    # Replace the sample store card with real data
-    sample_card = '''<div class="store-card">
-                        <h3 class="store-name">Sample Consignment Store</h3>
-                        <p class="store-address">123 Main Street, Sample City, CA 90210</p>
-                        <p class="store-reviews">★★★★★ (245 reviews)</p>
-                        <div class="store-features">
-                            <span class="feature-tag">Clothing</span>
-                            <span class="feature-tag">Furniture</span>
-                            <span class="feature-tag">Antiques</span>
-                            <span class="feature-tag">Friendly Staff</span>
-                        </div>
-                        <div class="store-contact">
-                            <a href="tel:555-123-4567" class="contact-link">📞 Call</a>
-                            <a href="https://example.com" class="contact-link" target="_blank">🌐 Website</a>
-                        </div>
-                    </div>'''
-    
-    homepage = homepage.replace(sample_card, featured_stores_html)
+    # Get top stores across all states from the review ranking
+    if review_order is None:
+        review_order, _, _ = rank_rows(df, df['Number of Reviews'].to_numpy())
+    featured_stores = df.iloc[review_order[:6]]  # Top 6 stores for homepage
     
     # Update state counts
     state_counts = {state: sum(len(stores) for stores in cities.values()) 
                    for state, cities in states_data.items()}
     
-    # Update popular states with real counts
-    ca_count = state_counts.get('California', 0)
-    tx_count = state_counts.get('Texas', 0)
-    fl_count = state_counts.get('Florida', 0)
-    ny_count = state_counts.get('New York', 0)
-    
-    homepage = homepage.replace('850+ stores', f'{ca_count}+ stores')
-    homepage = homepage.replace('650+ stores', f'{tx_count}+ stores')
-    homepage = homepage.replace('450+ stores', f'{fl_count}+ stores')
-    homepage = homepage.replace('400+ stores', f'{ny_count}+ stores')
-    
-    # Write updated homepage
-    with open('index.html', 'w', encoding='utf-8') as f:
-        f.write(homepage)
+    write_homepage([store for _, store in featured_stores.iterrows()], state_counts)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate directory pages from the store dataset")
+    parser.add_argument('--benchmark-grouping', type=int, metavar='ROWS',
+                        help="benchmark row grouping on a synthetic CSV with ROWS stores instead of generating pages")
+    parser.add_argument('--watch', action='store_true',
+                        help="keep running and re-render affected pages when the CSV or a template changes")
+    parser.add_argument('--interval', type=float, default=WATCH_INTERVAL, metavar='SECONDS',
+                        help=f"seconds between checks for changes in --watch mode (default: {WATCH_INTERVAL})")
+    args = parser.parse_args()
+
+    if args.benchmark_grouping:
+        benchmark_grouping(args.benchmark_grouping)
+    elif args.watch:
+        watch(interval=args.interval)
+    else:
+        main()
\ No newline at end of file
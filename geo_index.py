@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Offline geographic index for finding nearby cities
+Resolves store ZIP codes against the bundled zip_centroids.csv and answers k-nearest-city queries with a KD-tree
+"""
+
+import csv
+import heapq
+import math
+import re
+
+# Exported from the MIT-licensed zipcodes package; see zip_centroids.LICENSE.txt
+ZIP_CENTROIDS_PATH = 'zip_centroids.csv'
+
+EARTH_RADIUS_MILES = 3958.8
+
+# Trailing 5-digit ZIP (optionally ZIP+4) at the end of an address
+ZIP_RE = re.compile(r'\b(\d{5})(?:-\d{4})?\s*$')
+
+def load_zip_centroids(path=ZIP_CENTROIDS_PATH):
+    """Load the ZIP -> (lat, lon) table"""
+    centroids = {}
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            centroids[row['zip']] = (float(row['lat']), float(row['lon']))
+    return centroids
+
+def extract_zip(address):
+    """Return the 5-digit ZIP at the end of an address, or None"""
+    match = ZIP_RE.search(str(address))
+    return match.group(1) if match else None
+
+def to_xyz(lat, lon):
+    """Convert degrees to a point on the unit sphere"""
+    lat, lon = math.radians(lat), math.radians(lon)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+def chord_to_miles(chord):
+    """Convert a straight-line distance between unit-sphere points to great-circle miles"""
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, chord / 2))
+
+def locate_cities(city_addresses, centroids):
+    """Place each city at the mean of its stores' ZIP centroids
+
+    city_addresses maps a city key to an iterable of store addresses. Cities
+    with no resolvable ZIP are left out of the result.
+    """
+    locations = {}
+    for key, addresses in city_addresses.items():
+        points = [centroids[zip_code] for zip_code in map(extract_zip, addresses) if zip_code in centroids]
+        if not points:
+            continue
+        x, y, z = (sum(axis) for axis in zip(*(to_xyz(lat, lon) for lat, lon in points)))
+        norm = math.sqrt(x * x + y * y + z * z) or 1.0
+        locations[key] = (x / norm, y / norm, z / norm)
+    return locations
+
+class KDTree:
+    """Static 3-d tree over unit-sphere points for k-nearest-neighbour queries"""
+
+    def __init__(self, items):
+        """Build from (key, xyz) pairs"""
+        self._keys = [key for key, _ in items]
+        self._points = [point for _, point in items]
+        self._root = self._build(list(range(len(self._points))), 0)
+
+    def _build(self, indices, depth):
+        if not indices:
+            return None
+        axis = depth % 3
+        indices.sort(key=lambda i: self._points[i][axis])
+        mid = len(indices) // 2
+        return (indices[mid], axis,
+                self._build(indices[:mid], depth + 1),
+                self._build(indices[mid + 1:], depth + 1))
+
+    def nearest(self, point, k):
+        """Return up to k (key, chord distance) pairs closest to point, nearest first"""
+        heap = []  # max-heap on distance via negated squared distances
+
+        def visit(node):
+            if node is None:
+                return
+            index, axis, left, right = node
+            candidate = self._points[index]
+            dist_sq = sum((a - b) ** 2 for a, b in zip(point, candidate))
+            if len(heap) < k:
+                heapq.heappush(heap, (-dist_sq, index))
+            elif dist_sq < -heap[0][0]:
+                heapq.heapreplace(heap, (-dist_sq, index))
+
+            diff = point[axis] - candidate[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            # Only cross the splitting plane if it is closer than the current k-th best
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                visit(far)
+
+        visit(self._root)
+        return [(self._keys[index], math.sqrt(-neg_dist_sq))
+                for neg_dist_sq, index in sorted(heap, reverse=True)]
+
+def build_city_index(city_addresses, centroids=None):
+    """Locate cities from their store addresses and index them
+
+    Returns (locations, tree) where locations maps city key -> xyz.
+    """
+    if centroids is None:
+        centroids = load_zip_centroids()
+    locations = locate_cities(city_addresses, centroids)
+    return locations, KDTree(list(locations.items()))
+
+def nearest_cities(key, locations, tree, limit=10):
+    """Return up to limit (city key, miles) pairs nearest to a city, excluding itself"""
+    point = locations.get(key)
+    if point is None:
+        return []
+    return [(other, chord_to_miles(chord))
+            for other, chord in tree.nearest(point, limit + 1)
+            if other != key][:limit]
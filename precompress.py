@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Precompress generated pages and sitemaps for static hosting
+Writes .gz (and .br when the brotli module is installed) siblings next to each file
+"""
+
+import argparse
+import gzip
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import brotli
+except ImportError:  # Optional: only .gz siblings are written without it
+    brotli = None
+
+from build_manifest import MANIFEST_PATH, load_manifest, save_manifest
+from store_data import CACHE_DIR
+
+PRECOMPRESS_MANIFEST_PATH = os.path.join(CACHE_DIR, 'precompress-manifest.json')
+
+# Site-wide files produced outside the per-page manifest
+EXTRA_TARGETS = [
+    'index.html', 'about/index.html', 'sitemap/index.html',
+    'sitemap.xml', 'sitemap_index.xml'
+]
+
+def default_targets():
+    """Every page from the last page build plus the site-wide pages and sitemaps"""
+    targets = list(load_manifest(MANIFEST_PATH))
+    targets.extend(EXTRA_TARGETS)
+    targets.extend(sorted(name for name in os.listdir('.') if name.startswith('sitemap-') and name.endswith('.xml')))
+    return [path for path in dict.fromkeys(targets) if os.path.exists(path)]
+
+def compress_file(job):
+    """Write compressed siblings for one file unless its content hash is unchanged
+
+    Returns (path, digest, original bytes, gzip bytes, brotli bytes, skipped).
+    """
+    path, previous_digest = job
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+
+    gz_path = path + '.gz'
+    br_path = path + '.br'
+    siblings_exist = os.path.exists(gz_path) and (brotli is None or os.path.exists(br_path))
+    if digest == previous_digest and siblings_exist:
+        br_size = os.path.getsize(br_path) if brotli is not None else 0
+        return path, digest, len(data), os.path.getsize(gz_path), br_size, True
+
+    # mtime=0 keeps the .gz bytes identical for identical input
+    gz_data = gzip.compress(data, compresslevel=9, mtime=0)
+    with open(gz_path, 'wb') as f:
+        f.write(gz_data)
+
+    br_size = 0
+    if brotli is not None:
+        br_data = brotli.compress(data, quality=11)
+        with open(br_path, 'wb') as f:
+            f.write(br_data)
+        br_size = len(br_data)
+
+    return path, digest, len(data), len(gz_data), br_size, False
+
+def precompress(paths, jobs=1):
+    """Compress paths across jobs processes and print a ratio/time report"""
+    start = time.perf_counter()
+    previous = load_manifest(PRECOMPRESS_MANIFEST_PATH)
+    work = [(path, previous.get(path)) for path in paths]
+
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(compress_file, work, chunksize=max(1, len(work) // (jobs * 4))))
+    else:
+        results = list(map(compress_file, work))
+
+    manifest = {}
+    compressed = skipped = 0
+    original_total = gz_total = br_total = 0
+    for path, digest, original, gz_size, br_size, was_skipped in results:
+        manifest[path] = digest
+        original_total += original
+        gz_total += gz_size
+        br_total += br_size
+        if was_skipped:
+            skipped += 1
+        else:
+            compressed += 1
+    save_manifest(manifest, PRECOMPRESS_MANIFEST_PATH)
+
+    elapsed = time.perf_counter() - start
+    print(f"Precompressed {compressed} files, {skipped} unchanged ({elapsed:.2f} s)")
+    if original_total:
+        print(f"  Original: {original_total:,} bytes")
+        print(f"  gzip -9:  {gz_total:,} bytes ({gz_total / original_total:.1%} of original)")
+        if brotli is not None:
+            print(f"  brotli:   {br_total:,} bytes ({br_total / original_total:.1%} of original)")
+        else:
+            print("  brotli:   skipped (module not installed)")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Write .gz/.br siblings for generated pages and sitemaps")
+    parser.add_argument('paths', nargs='*', help="files to compress (default: every generated page and sitemap)")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, metavar='N',
+                        help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    precompress(args.paths or default_targets(), args.jobs)
+
+if __name__ == '__main__':
+    main()
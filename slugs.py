@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+URL slugs for state and city pages
+One registry per dataset maps names to slugs and back, and keeps colliding city names from sharing a page
+"""
+
+import re
+from functools import lru_cache
+
+from store_data import group_cities_by_state, load_stores
+
+SLUG_STRIP_RE = re.compile(r'[^\w\s-]')
+SLUG_DASH_RE = re.compile(r'[-\s]+')
+
+@lru_cache(maxsize=None)
+def slugify(text):
+    """Convert text to URL-friendly slug"""
+    text = text.lower()
+    text = SLUG_STRIP_RE.sub('', text)
+    text = SLUG_DASH_RE.sub('-', text)
+    return text.strip('-')
+
+class SlugRegistry:
+    """Two-way name <-> slug lookup for every state and city in a dataset
+
+    Cities in the same state whose names collapse to one slug (e.g. "McCall"
+    and "Mccall") would overwrite each other's index.html. The first name in
+    sorted order keeps the plain slug and the others get -2, -3, ... suffixes;
+    each collision is recorded in self.collisions as (state, slug, names).
+    """
+
+    def __init__(self, state_cities=None):
+        """Build from a state -> iterable of city names mapping"""
+        self.state_slugs = {}
+        self.state_names = {}
+        self.city_slugs = {}
+        self.city_names = {}
+        self.collisions = []
+        for state, cities in sorted((state_cities or {}).items()):
+            self.add_state(state, cities)
+
+    def add_state(self, state, cities):
+        """Register a state and all of its cities at once"""
+        state_slug = self.state_slugs.get(state)
+        if state_slug is None:
+            state_slug = self._claim(self.state_names, slugify(state), state, None)
+            self.state_slugs[state] = state_slug
+
+        # Cities are claimed in sorted order so suffixes don't depend on row order
+        taken = {city_slug for (slug, city_slug) in self.city_names if slug == state_slug}
+        names_by_slug = {}
+        for city in sorted(set(cities)):
+            if (state, city) in self.city_slugs:
+                continue
+            base = slugify(city)
+            city_slug = base
+            suffix = 2
+            while city_slug in taken:
+                city_slug = f"{base}-{suffix}"
+                suffix += 1
+            taken.add(city_slug)
+            names_by_slug.setdefault(base, []).append(city)
+            self.city_slugs[(state, city)] = city_slug
+            self.city_names[(state_slug, city_slug)] = city
+
+        for base, names in names_by_slug.items():
+            if len(names) > 1:
+                self.collisions.append((state, base, names))
+
+    def _claim(self, names, slug, name, scope):
+        """Return slug, suffixed if another name already holds it"""
+        base = slug
+        suffix = 2
+        while slug in names and names[slug] != name:
+            slug = f"{base}-{suffix}"
+            suffix += 1
+        if slug != base:
+            self.collisions.append((scope, base, [names[base], name]))
+        names[slug] = name
+        return slug
+
+    def state_slug(self, state):
+        """Slug for a registered state"""
+        return self.state_slugs[state]
+
+    def city_slug(self, state, city):
+        """Slug for a registered city, unique within its state"""
+        return self.city_slugs[(state, city)]
+
+    def state_name(self, state_slug):
+        """State name for a slug, or None"""
+        return self.state_names.get(state_slug)
+
+    def city_name(self, state_slug, city_slug):
+        """City name for a state slug and city slug, or None"""
+        return self.city_names.get((state_slug, city_slug))
+
+    def subset(self, state):
+        """A registry with every state but only this state's cities, small enough to ship to a worker"""
+        part = SlugRegistry()
+        part.state_slugs = self.state_slugs
+        part.state_names = self.state_names
+        state_slug = self.state_slugs[state]
+        for (city_state, city), city_slug in self.city_slugs.items():
+            if city_state == state:
+                part.city_slugs[(state, city)] = city_slug
+                part.city_names[(state_slug, city_slug)] = city
+        return part
+
+    def report_collisions(self):
+        """Print a warning for each set of names that share a slug"""
+        for state, slug, names in self.collisions:
+            where = f" in {state}" if state else ''
+            print(f"Warning: {', '.join(repr(name) for name in names)}{where} all slugify to '{slug}'; "
+                  f"later names get numbered slugs")
+
+def build_slug_registry(stores=None):
+    """Build the registry for a store dataset (the shared dataset by default)"""
+    if stores is None:
+        stores = load_stores()
+    return SlugRegistry(group_cities_by_state(stores))
+
+def main():
+    """Report slug counts and collisions for the shared dataset"""
+    slugs = build_slug_registry()
+    print(f"{len(slugs.state_slugs)} state slugs, {len(slugs.city_slugs)} city slugs")
+    slugs.report_collisions()
+
+if __name__ == '__main__':
+    main()
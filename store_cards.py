@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Store card markup shared by generate_pages.py and build.py
+Renders the card for one store row and patches the homepage's featured stores and state counts, without pandas
+"""
+
+import html
+import math
+import re
+
+from store_data import FEATURE_BITS, PRICING_BITS
+
+HOMEPAGE_PATH = 'index.html'
+
+def is_missing(value):
+    """True for None and NaN, the blanks a DataFrame row can hold"""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+def format_phone(phone):
+    """Format phone number for display"""
+    if is_missing(phone) or phone == '' or phone == 'No data available':
+        return None
+    phone = str(phone).strip()
+    if phone.startswith('+1'):
+        phone = phone[2:].strip()
+    # Format as (XXX) XXX-XXXX
+    digits = re.sub(r'\D', '', phone)
+    if len(digits) == 10:
+        return f"({digits[:3]}) {digits[3:6]}-{digits[6:]}"
+    return phone
+
+def format_website(site):
+    """Format website URL"""
+    if is_missing(site) or site == '' or site == 'No data available':
+        return None
+    site = str(site).strip()
+    if not site.startswith('http'):
+        site = 'https://' + site
+    return site
+
+# Tag shown for each feature bit, in the order tags appear on a store card
+FEATURE_TAGS = [
+    (PRICING_BITS['Low'], 'Affordable Pricing'),
+    (PRICING_BITS['Mid-Range'], 'Fair Pricing'),
+    (FEATURE_BITS['wide_selection'], 'Wide Selection'),
+    (FEATURE_BITS['sell_antiques'], 'Antiques'),
+    (FEATURE_BITS['sell_books'], 'Books'),
+    (FEATURE_BITS['clean_organized'], 'Clean & Organized'),
+    (FEATURE_BITS['sell_clothes'], 'Clothing'),
+    (FEATURE_BITS['sell_furniture'], 'Furniture'),
+    (FEATURE_BITS['sell_jewelry'], 'Jewelry'),
+    (FEATURE_BITS['sell_gift_items'], 'Gift Items'),
+    (FEATURE_BITS['sell_premium_brand'], 'Premium Brands'),
+    (FEATURE_BITS['friendly_employees'], 'Friendly Staff')
+]
+
+def get_store_features(row):
+    """Extract store features as tags"""
+    mask = row['feature_mask']
+    return [tag for bit, tag in FEATURE_TAGS if mask & bit]
+
+def generate_store_card_html(store):
+    """Generate HTML for a single store card"""
+    name = html.escape(str(store['Business Name']))
+    address = html.escape(str(store['Address']))
+    reviews = store.get('Number of Reviews', 0)
+    phone = format_phone(store.get('Phone'))
+    website = format_website(store.get('Site'))
+    photo = store.get('Photo', '')
+    features = get_store_features(store)
+    
+    # Generate star rating based on review count (simplified)
+    if reviews > 200:
+        stars = "★★★★★"
+    elif reviews > 100:
+        stars = "★★★★☆"
+    elif reviews > 50:
+        stars = "★★★☆☆"
+    elif reviews > 20:
+        stars = "★★☆☆☆"
+    else:
+        stars = "★☆☆☆☆"
+    
+    feature_tags = ''.join([f'<span class="feature-tag">{feature}</span>' for feature in features[:4]])
+    
+    contact_links = []
+    if phone:
+        contact_links.append(f'<a href="tel:{phone.replace("(", "").replace(")", "").replace("-", "").replace(" ", "")}" class="contact-link">📞 Call</a>')
+    if website:
+        contact_links.append(f'<a href="{website}" class="contact-link" target="_blank">🌐 Website</a>')
+    
+    contact_html = '<div class="store-contact">' + ''.join(contact_links) + '</div>' if contact_links else ''
+    
+    return f'''
+        <div class="store-card">
+            <h3 class="store-name">{name}</h3>
+            <p class="store-address">{address}</p>
+            <p class="store-reviews">{stars} ({reviews} reviews)</p>
+            <div class="store-features">
+                {feature_tags}
+            </div>
+            {contact_html}
+        </div>
+    '''
+
+def write_homepage(featured_stores, state_counts):
+    """Fill the homepage's sample store card and popular state counts with real data
+    
+    featured_stores are rows keyed by CSV column names (see store_data.store_to_row).
+    """
+    featured_stores_html = '\n'.join([generate_store_card_html(store) for store in featured_stores])
+    
+    # Read current homepage
+    with open(HOMEPAGE_PATH, 'r', encoding='utf-8') as f:
+        homepage = f.read()
+    
+    # Replace the sample store card with real data
+    sample_card = '''<div class="store-card">
+                        <h3 class="store-name">Sample Consignment Store</h3>
+                        <p class="store-address">123 Main Street, Sample City, CA 90210</p>
+                        <p class="store-reviews">★★★★★ (245 reviews)</p>
+                        <div class="store-features">
+                            <span class="feature-tag">Clothing</span>
+                            <span class="feature-tag">Furniture</span>
+                            <span class="feature-tag">Antiques</span>
+                            <span class="feature-tag">Friendly Staff</span>
+                        </div>
+                        <div class="store-contact">
+                            <a href="tel:555-123-4567" class="contact-link">📞 Call</a>
+                            <a href="https://example.com" class="contact-link" target="_blank">🌐 Website</a>
+                        </div>
+                    </div>'''
+    
+    homepage = homepage.replace(sample_card, featured_stores_html)
+    
+    # Update popular states with real counts
+    ca_count = state_counts.get('California', 0)
+    tx_count = state_counts.get('Texas', 0)
+    fl_count = state_counts.get('Florida', 0)
+    ny_count = state_counts.get('New York', 0)
+    
+    homepage = homepage.replace('850+ stores', f'{ca_count}+ stores')
+    homepage = homepage.replace('650+ stores', f'{tx_count}+ stores')
+    homepage = homepage.replace('450+ stores', f'{fl_count}+ stores')
+    homepage = homepage.replace('400+ stores', f'{ny_count}+ stores')
+    
+    # Write updated homepage
+    with open(HOMEPAGE_PATH, 'w', encoding='utf-8') as f:
+        f.write(homepage)
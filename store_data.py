@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Shared store dataset loader for the page and sitemap generators
+Parses consignment_stores.csv once and keeps a binary cache keyed by the CSV's content hash
+"""
+
+import csv
+import hashlib
+import io
+import os
+import pickle
+import re
+import sys
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import NamedTuple
+
+CSV_PATH = 'consignment_stores.csv'
+CACHE_DIR = '.build-cache'
+
+# Bump when the normalization rules below change so stale caches are ignored
+CACHE_VERSION = 3
+
+# Rows held in memory across all states before streaming ingestion spills to disk
+SPILL_BUFFER_ROWS = 50000
+
+# Raw Yes/No and pricing columns of the CSV
+ATTRIBUTE_COLUMNS = [
+    'pricing', 'wide_selection', 'sell_antiques', 'sell_books', 'clean_organized',
+    'sell_clothes', 'sell_furniture', 'sell_jewelry', 'sell_gift_items',
+    'sell_premium_brand', 'sell_merchandise', 'friendly_employees'
+]
+
+# Bit set in a store's feature_mask for each Yes/No column
+FEATURE_BITS = {col: 1 << i for i, col in enumerate(ATTRIBUTE_COLUMNS[1:])}
+
+# Pricing tiers use the bits after the Yes/No columns; masks fit in a uint16
+PRICING_BITS = {
+    'Low': 1 << len(FEATURE_BITS),
+    'Mid-Range': 1 << (len(FEATURE_BITS) + 1),
+    'High': 1 << (len(FEATURE_BITS) + 2)
+}
+
+def get_price_level_text(pricing):
+    """Convert pricing code to display text"""
+    if pricing == "Low":
+        return "Affordable Pricing"
+    elif pricing == "High":
+        return "High-End Pricing"
+    else:
+        return "Mid-Range Pricing"
+
+# Punctuation dropped from addresses before deriving a store ID
+ADDRESS_PUNCT_RE = re.compile(r'[^\w\s#]')
+
+# Display name for each Yes/No column, in column (and bit) order
+FEATURE_NAMES = {
+    'wide_selection': 'Wide Selection',
+    'sell_antiques': 'Antiques',
+    'sell_books': 'Books',
+    'clean_organized': 'Clean & Organized',
+    'sell_clothes': 'Clothing',
+    'sell_furniture': 'Furniture',
+    'sell_jewelry': 'Jewelry',
+    'sell_gift_items': 'Gift Items',
+    'sell_premium_brand': 'Premium Brands',
+    'sell_merchandise': 'General Merchandise',
+    'friendly_employees': 'Friendly Staff'
+}
+
+class Store(NamedTuple):
+    """One normalized store row
+
+    Immutable and without a per-instance __dict__; state, city and pricing
+    are interned so every store in a city shares the same string objects.
+    Yes/No columns and the pricing tier live in feature_mask.
+    """
+    name: str
+    address: str
+    city: str
+    state: str
+    phone: str
+    website: str
+    reviews: int
+    photo: str
+    pricing: str
+    feature_mask: int
+
+    @property
+    def features(self):
+        """Pricing text followed by each Yes column's display name"""
+        return features_from_mask(self.feature_mask)
+
+    @property
+    def store_id(self):
+        """Stable ID from the name and normalized address (see store_id)"""
+        return store_id(self.name, self.address)
+
+def store_to_row(store, feature_mask=False):
+    """Map a Store back onto the CSV's column names
+
+    Yes/No columns are decoded from the store's feature_mask, or with
+    feature_mask=True the mask itself is kept under 'feature_mask' instead.
+    """
+    row = {
+        'Business Name': store.name,
+        'Address': store.address,
+        'City': store.city,
+        'State': store.state,
+        'Number of Reviews': store.reviews,
+        'Site': store.website,
+        'Phone': store.phone,
+        'Photo': store.photo,
+        'pricing': store.pricing
+    }
+    if feature_mask:
+        row['feature_mask'] = store.feature_mask
+        return row
+    for field, bit in FEATURE_BITS.items():
+        row[field] = 'Yes' if store.feature_mask & bit else 'No'
+    return row
+
+@lru_cache(maxsize=None)
+def features_from_mask(mask):
+    """Decode a feature_mask into its pricing text and feature display names, as a shared tuple"""
+    if mask & PRICING_BITS['Low']:
+        pricing = 'Low'
+    elif mask & PRICING_BITS['High']:
+        pricing = 'High'
+    else:
+        pricing = 'Mid-Range'
+    features = [get_price_level_text(pricing)]
+    features.extend(name for field, name in FEATURE_NAMES.items() if mask & FEATURE_BITS[field])
+    return tuple(features)
+
+def get_feature_mask(row):
+    """Encode a row's Yes/No columns and pricing tier as an integer bitmask"""
+    mask = PRICING_BITS.get((row.get('pricing') or '').strip(), 0)
+    for field, bit in FEATURE_BITS.items():
+        if (row.get(field) or '').strip().lower() == 'yes':
+            mask |= bit
+    return mask
+
+def clean_state(state):
+    """Normalize a raw State cell, returning '' for rows that should be skipped"""
+    state = state.strip()
+
+    # Clean up state name (remove zip codes, etc.)
+    state = re.sub(r'\s+\d{5}"?$', '', state)
+    state = state.replace('"', '').strip()
+
+    # Skip if state is actually a zip code or other invalid data
+    if state.isdigit() or len(state) < 3:
+        return ''
+    return state
+
+def parse_reviews(value):
+    """Parse the review count, treating blanks and junk as 0"""
+    try:
+        return int(str(value or 0).strip())
+    except ValueError:
+        return 0
+
+def normalize_address(address):
+    """Lowercase an address and drop punctuation and repeated whitespace"""
+    return ' '.join(ADDRESS_PUNCT_RE.sub(' ', address.lower()).split())
+
+def store_id(name, address):
+    """16-hex-digit store ID that survives case, punctuation and spacing edits to the name or address"""
+    key = f"{' '.join(name.lower().split())}\n{normalize_address(address)}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+def parse_row(row):
+    """Convert one CSV row into a normalized store record, or None if invalid"""
+    state = clean_state(row['State'] or '')
+    city = (row['City'] or '').strip()
+
+    # Skip invalid entries
+    if not state or not city:
+        return None
+
+    return Store(
+        name=row['Business Name'].strip(),
+        address=row['Address'].strip(),
+        city=sys.intern(city),
+        state=sys.intern(state),
+        phone=(row.get('Phone') or '').strip(),
+        website=(row.get('Site') or '').strip(),
+        reviews=parse_reviews(row.get('Number of Reviews')),
+        photo=(row.get('Photo') or '').strip(),
+        pricing=sys.intern((row.get('pricing') or '').strip()),
+        feature_mask=get_feature_mask(row)
+    )
+
+def parse_csv_text(text):
+    """Parse CSV text into a list of normalized store records"""
+    stores = []
+    for row in csv.DictReader(io.StringIO(text)):
+        store = parse_row(row)
+        if store is not None:
+            stores.append(store)
+    return stores
+
+def iter_csv_stores(csv_path=CSV_PATH):
+    """Yield normalized store records one row at a time without reading the whole file"""
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            store = parse_row(row)
+            if store is not None:
+                yield store
+
+def _flush_spill(buffers, spill_files):
+    """Append each state's buffered rows to its spill file and clear the buffers"""
+    for state, stores in buffers.items():
+        if stores:
+            with open(spill_files[state], 'ab') as f:
+                pickle.dump(stores, f, protocol=pickle.HIGHEST_PROTOCOL)
+    buffers.clear()
+
+def read_spill(path):
+    """Read back every batch appended to a spill file, in write order"""
+    stores = []
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                stores.extend(pickle.load(f))
+            except EOFError:
+                return stores
+
+def spill_by_state(spill_dir, csv_path=CSV_PATH, buffer_rows=SPILL_BUFFER_ROWS):
+    """Partition the CSV into one spill file per state under spill_dir
+
+    At most buffer_rows rows are held in memory before being appended to
+    disk. Returns a state -> spill path mapping in first-seen order.
+    """
+    spill_files = {}
+    buffers = defaultdict(list)
+    buffered = 0
+
+    for store in iter_csv_stores(csv_path):
+        state = store.state
+        if state not in spill_files:
+            spill_files[state] = os.path.join(spill_dir, f"{len(spill_files)}.pickle")
+        buffers[state].append(store)
+        buffered += 1
+        if buffered >= buffer_rows:
+            _flush_spill(buffers, spill_files)
+            buffered = 0
+    _flush_spill(buffers, spill_files)
+
+    return spill_files
+
+# Files kept per CSV digest: the pickled records and store_delta's row index
+CACHE_EXTENSIONS = ('.pickle', '.rows')
+
+def _cache_path(csv_path, digest, ext='.pickle'):
+    base = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(CACHE_DIR, f"{base}-v{CACHE_VERSION}-{digest[:16]}{ext}")
+
+def _prune_cache(csv_path, keep):
+    """Remove cache files for the same CSV that belong to other digests than keep's"""
+    base = os.path.splitext(os.path.basename(csv_path))[0] + '-'
+    keep_stem = os.path.splitext(keep)[0]
+    for name in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, name)
+        stem, ext = os.path.splitext(path)
+        if name.startswith(base) and ext in CACHE_EXTENSIONS and stem != keep_stem:
+            os.remove(path)
+
+def row_index_path(csv_path, digest):
+    """Path of the row index store_delta keeps beside the cache for the CSV content with this digest"""
+    return _cache_path(csv_path, digest, '.rows')
+
+def save_cache(csv_path, digest, stores):
+    """Write stores as the binary cache for the CSV content with this SHA-256 hex digest"""
+    cache_path = _cache_path(csv_path, digest)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(stores, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+    _prune_cache(csv_path, cache_path)
+
+def read_cache(csv_path, digest):
+    """Return the cached stores for the CSV content with this SHA-256 hex digest, or None"""
+    cache_path = _cache_path(csv_path, digest)
+    if not os.path.exists(cache_path):
+        return None
+    with open(cache_path, 'rb') as f:
+        return pickle.load(f)
+
+def load_stores(csv_path=CSV_PATH, use_cache=True):
+    """Return the normalized store records, reading the binary cache when it is current"""
+    with open(csv_path, 'rb') as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+
+    if use_cache:
+        stores = read_cache(csv_path, digest)
+        if stores is not None:
+            return stores
+
+    stores = parse_csv_text(raw.decode('utf-8'))
+
+    if use_cache:
+        save_cache(csv_path, digest, stores)
+
+    return stores
+
+def group_cities_by_state(stores):
+    """Map each state to the set of cities that have stores"""
+    state_cities = defaultdict(set)
+    for store in stores:
+        state_cities[store.state].add(store.city)
+    return state_cities
+
+def main():
+    """Report cold and warm load times for the dataset"""
+    start = time.perf_counter()
+    stores = load_stores(use_cache=False)
+    parse_time = time.perf_counter() - start
+
+    # Cold load: parse the CSV and write a fresh cache
+    with open(CSV_PATH, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    cache_path = _cache_path(CSV_PATH, digest)
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+    start = time.perf_counter()
+    load_stores()
+    cold_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    load_stores()
+    warm_time = time.perf_counter() - start
+
+    print(f"Loaded {len(stores)} stores from {CSV_PATH}")
+    print(f"  Parse only:                      {parse_time * 1000:.1f} ms")
+    print(f"  Cold load (parse + cache write): {cold_time * 1000:.1f} ms")
+    print(f"  Warm load (cache read):          {warm_time * 1000:.1f} ms")
+    print(f"  Cache file: {cache_path} ({os.path.getsize(cache_path):,} bytes)")
+
+if __name__ == '__main__':
+    # Run the importable module, so cached and spilled records pickle as store_data.Store
+    import store_data
+    store_data.main()
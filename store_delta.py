@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Apply an upstream change file (adds, updates, deletes) to consignment_stores.csv
+Rows are matched by store ID through a row index kept beside the record cache, so only changed rows are
+parsed, hashed or looked up (O(log n) each); the affected states and cities are reported for page regeneration.
+The dataset is a plain CSV, so rewriting and hashing it, and loading and saving the pickled cache and index,
+stay linear in its size; those passes copy untouched rows in slices without parsing them
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import pickle
+from array import array
+
+from store_data import CSV_PATH, parse_row, read_cache, row_index_path, save_cache, store_id
+
+# Bumped when the row index layout changes, so older indexes are rebuilt
+ROW_INDEX_VERSION = 2
+
+ACTION_COLUMN = 'action'
+ACTIONS = ('add', 'update', 'delete')
+
+# Optional delta column naming the store an update or delete targets, for edits that change its name or address
+ID_COLUMN = 'store_id'
+
+class DeltaError(ValueError):
+    """Raised for malformed delta files or changes that don't match the dataset"""
+
+def row_store_id(row):
+    """Store ID of a raw CSV row dict"""
+    return store_id((row.get('Business Name') or '').strip(), (row.get('Address') or '').strip())
+
+def read_delta(delta_path, header):
+    """Return [(line, action, target store ID, new row values or None)] from a delta CSV"""
+    with open(delta_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        if ACTION_COLUMN not in (reader.fieldnames or []):
+            raise DeltaError(f"{delta_path}: missing '{ACTION_COLUMN}' column")
+
+        changes = []
+        for row in reader:
+            line = reader.line_num
+            action = (row[ACTION_COLUMN] or '').strip().lower()
+            if action not in ACTIONS:
+                raise DeltaError(f"{delta_path}:{line}: unknown action {row[ACTION_COLUMN]!r}")
+            target = (row.get(ID_COLUMN) or '').strip() or row_store_id(row)
+            values = None if action == 'delete' else [row.get(column) or '' for column in header]
+            changes.append((line, action, target, values))
+    return changes
+
+def prefix_tree(values):
+    """Binary indexed (Fenwick) tree over values, for prefix sums that stay O(log n) to update"""
+    tree = array('q', [0, *values])
+    for i in range(1, len(tree)):
+        parent = i + (i & -i)
+        if parent < len(tree):
+            tree[parent] += tree[i]
+    return tree
+
+def prefix_sum(tree, i):
+    """Sum of the first i values"""
+    total = 0
+    while i:
+        total += tree[i]
+        i &= i - 1
+    return total
+
+def prefix_add(tree, i, delta):
+    """Add delta to value i"""
+    i += 1
+    while i < len(tree):
+        tree[i] += delta
+        i += i & -i
+
+def prefix_append(tree, value):
+    """Append a value to the tree"""
+    i = len(tree)
+    tree.append(value + prefix_sum(tree, i - 1) - prefix_sum(tree, i - (i & -i)))
+
+def build_row_index(raw):
+    """Parse raw CSV bytes into (row index, Store records)
+
+    The index holds the header, its byte length and line terminator, and for
+    every row slot its byte length and whether parse_row keeps it (and so
+    whether it has a record in the cache), with prefix trees over both that
+    give a slot's byte offset and record position. 'rows' maps each store ID
+    to its slots. Blank lines count towards the row after them.
+    """
+    offset = 0
+
+    def lines():
+        nonlocal offset
+        for line in io.BytesIO(raw):
+            offset += len(line)
+            yield line.decode('utf-8')
+
+    source = lines()
+    header = next(csv.reader(source), None)
+    if header is None:
+        raise DeltaError("dataset has no header row")
+    header_len = offset
+    terminator = '\r\n' if raw[:header_len].endswith(b'\r\n') else '\n'
+
+    lengths = array('Q')
+    valid = bytearray()
+    rows = {}
+    stores = []
+    end = header_len
+    # Reads the same records load_stores' DictReader does, one line at a time
+    for slot, row in enumerate(csv.DictReader(source, fieldnames=header)):
+        lengths.append(offset - end)
+        end = offset
+        rows.setdefault(row_store_id(row), []).append(slot)
+        store = parse_row(row)
+        valid.append(store is not None)
+        if store is not None:
+            stores.append(store)
+
+    index = {
+        'version': ROW_INDEX_VERSION,
+        'header': header,
+        'header_len': header_len,
+        'terminator': terminator,
+        'lengths': lengths,
+        'valid': valid,
+        'offsets': prefix_tree(lengths),
+        'positions': prefix_tree(valid),
+        'rows': rows
+    }
+    return index, stores
+
+def read_row_index(csv_path, digest):
+    """Return the row index for the CSV content with this digest, or None"""
+    path = row_index_path(csv_path, digest)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        index = pickle.load(f)
+    if not isinstance(index, dict) or index.get('version') != ROW_INDEX_VERSION:
+        return None
+    return index
+
+def save_row_index(csv_path, digest, index):
+    """Write the row index beside the record cache for this digest"""
+    path = row_index_path(csv_path, digest)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+def apply_delta(index, stores, changes):
+    """Match changes against a row index and its cached records
+
+    Returns (affected, edits): {(state, city)} of every city a changed store
+    was or is in, and {slot: new values, or None for a removed row}, with
+    added rows in new slots after the existing ones. An update rewrites the
+    first row with the store's ID and removes any duplicates. The index's
+    'rows' map is updated in place; only the changed rows are looked up or
+    parsed.
+    """
+    header = index['header']
+    valid = index['valid']
+    positions = index['positions']
+    rows = index['rows']
+    records = {}
+
+    def record(slot):
+        if slot in records:
+            return records[slot]
+        return stores[prefix_sum(positions, slot)] if valid[slot] else None
+
+    edits = {}
+    affected = set()
+    next_slot = len(valid)
+    for line, action, target, values in changes:
+        existing = rows.get(target, [])
+        if action == 'add' and existing:
+            raise DeltaError(f"line {line}: add of existing store {target}")
+        if action != 'add' and not existing:
+            raise DeltaError(f"line {line}: {action} of unknown store {target}")
+
+        for i in existing:
+            store = record(i)
+            if store is not None:
+                affected.add((store.state, store.city))
+        rows.pop(target, None)
+        if action == 'delete':
+            for i in existing:
+                edits[i] = records[i] = None
+            continue
+
+        row = dict(zip(header, values))
+        store = parse_row(row)
+        if store is not None:
+            affected.add((store.state, store.city))
+        if action == 'add':
+            i = next_slot
+            next_slot += 1
+        else:
+            i, *duplicates = existing
+            for j in duplicates:
+                edits[j] = records[j] = None
+        edits[i] = values
+        records[i] = store
+        rows[row_store_id(row)] = sorted(rows.get(row_store_id(row), []) + [i])
+
+    return affected, edits
+
+def rewrite_dataset(raw, index, stores, edits):
+    """Return (CSV bytes, Store records) with edits applied, updating the index in place
+
+    Runs of untouched rows are copied as byte and list slices, so they stay
+    byte-identical; edited and added rows use the file's line terminator.
+    Removed rows keep their slot with a zero length, so no other slot moves.
+    """
+    header = index['header']
+    terminator = index['terminator']
+    header_len = index['header_len']
+    lengths = index['lengths']
+    valid = index['valid']
+    offsets = index['offsets']
+    positions = index['positions']
+    n = len(lengths)
+    rows_end = header_len + prefix_sum(offsets, n)
+
+    new_stores = []
+    chunks = [raw[:header_len]]
+    # (slot, byte length, kept by parse_row) of every edited or added row, applied once all offsets are read
+    updates = []
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator=terminator)
+
+    def write_row(slot, values):
+        if values is None:
+            updates.append((slot, 0, False))
+            return
+        # Only a last row without a trailing newline, or a bare header, can lack one
+        if not chunks[-1].endswith(b'\n'):
+            chunks[-1] += terminator.encode('ascii')
+            last = n - 1
+            while last >= 0 and not lengths[last]:
+                last -= 1
+            if last >= 0:
+                updates.append((last, lengths[last] + len(terminator), valid[last]))
+            else:
+                index['header_len'] += len(terminator)
+        out.seek(0)
+        out.truncate()
+        writer.writerow(values)
+        chunk = out.getvalue().encode('utf-8')
+        store = parse_row(dict(zip(header, values)))
+        chunks.append(chunk)
+        updates.append((slot, len(chunk), store is not None))
+        if store is not None:
+            new_stores.append(store)
+
+    offset = header_len
+    position = 0
+    for slot in sorted(edits):
+        if slot < n:
+            start = header_len + prefix_sum(offsets, slot)
+            if offset < start:
+                chunks.append(raw[offset:start])
+            stop = prefix_sum(positions, slot)
+            new_stores.extend(stores[position:stop])
+            offset = start + lengths[slot]
+            position = stop + valid[slot]
+        elif offset < rows_end:
+            chunks.append(raw[offset:rows_end])
+            new_stores.extend(stores[position:])
+            offset = rows_end
+            position = len(stores)
+        write_row(slot, edits[slot])
+    if offset < rows_end:
+        chunks.append(raw[offset:rows_end])
+    new_stores.extend(stores[position:])
+    # Blank lines after the last row stay at the end of the file
+    chunks.append(raw[rows_end:])
+
+    for slot, length, kept in updates:
+        if slot < len(lengths):
+            prefix_add(offsets, slot, length - lengths[slot])
+            prefix_add(positions, slot, kept - valid[slot])
+            lengths[slot] = length
+            valid[slot] = kept
+        else:
+            lengths.append(length)
+            valid.append(kept)
+            prefix_append(offsets, length)
+            prefix_append(positions, kept)
+
+    return b''.join(chunks), new_stores
+
+def ingest_delta(delta_path, csv_path=CSV_PATH):
+    """Apply a delta file to csv_path and refresh its cache; returns the affected (state, city) pairs
+
+    Untouched rows are byte-identical in the rewritten CSV. The record cache
+    and row index for the new CSV are written from the patched ones, so
+    neither the next load_stores() nor the next delta re-parses anything.
+    Without a cache and index for the current CSV both are built first.
+    """
+    with open(csv_path, 'rb') as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    index = read_row_index(csv_path, digest)
+    stores = read_cache(csv_path, digest)
+    if index is None or stores is None:
+        index, stores = build_row_index(raw)
+
+    changes = read_delta(delta_path, index['header'])
+    affected, edits = apply_delta(index, stores, changes)
+    data, stores = rewrite_dataset(raw, index, stores, edits)
+
+    tmp_path = csv_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, csv_path)
+    digest = hashlib.sha256(data).hexdigest()
+    save_cache(csv_path, digest, stores)
+    save_row_index(csv_path, digest, index)
+
+    return affected
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply a delta CSV of store adds, updates and deletes to the dataset")
+    parser.add_argument('delta', help=f"CSV with the dataset's columns plus '{ACTION_COLUMN}' "
+                                      f"({', '.join(ACTIONS)}) and an optional '{ID_COLUMN}'")
+    parser.add_argument('--csv', default=CSV_PATH, help=f"dataset to update (default: {CSV_PATH})")
+    parser.add_argument('--affected', metavar='PATH',
+                        help="also write the affected states and cities to PATH as JSON")
+    args = parser.parse_args()
+
+    affected = ingest_delta(args.delta, args.csv)
+    states = sorted({state for state, _ in affected})
+    print(f"Applied {args.delta} to {args.csv}: {len(affected)} cities in {len(states)} states affected")
+    for state, city in sorted(affected):
+        print(f"  {city}, {state}")
+
+    if args.affected:
+        with open(args.affected, 'w', encoding='utf-8') as f:
+            json.dump({
+                'states': states,
+                'cities': [{'state': state, 'city': city} for state, city in sorted(affected)]
+            }, f, indent=2, ensure_ascii=False)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Review ranking shared by every featured and top-N section
+The dataset is sorted by review count once; each state and city keeps its stores in that order,
+so a top-K query anywhere is a slice instead of another sort
+"""
+
+from collections import defaultdict
+
+class ReviewRanking:
+    """Stores ranked by review count, most first, ties in dataset order
+
+    order is the global permutation (indexes into stores); states maps each
+    state, and cities each (state, city), to its stores' indexes in that
+    same order.
+    """
+
+    def __init__(self, stores):
+        self.stores = stores
+        self.order = sorted(range(len(stores)), key=lambda i: stores[i].reviews, reverse=True)
+        self.states = defaultdict(list)
+        self.cities = defaultdict(list)
+        for i in self.order:
+            store = stores[i]
+            self.states[store.state].append(i)
+            self.cities[(store.state, store.city)].append(i)
+
+    def _take(self, indexes, k):
+        stores = self.stores
+        return [stores[i] for i in indexes[:k]]
+
+    def top(self, k=None):
+        """The k most-reviewed stores overall, or every store in review order"""
+        return self._take(self.order, k)
+
+    def state_top(self, state, k=None):
+        """The k most-reviewed stores in a state, or all of them in review order"""
+        return self._take(self.states.get(state, []), k)
+
+    def city_top(self, state, city, k=None):
+        """The k most-reviewed stores in a city, or all of them in review order"""
+        return self._take(self.cities.get((state, city), []), k)
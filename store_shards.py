@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Per-state (and optionally per-city) JSON shards of the store dataset
+Clients fetch the small index, then only the shards they need, instead of the whole public/stores-data.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from collections import defaultdict
+
+from slugs import SlugRegistry
+from store_data import group_cities_by_state, load_stores, store_to_row
+
+SHARD_DIR = os.path.join('public', 'stores')
+INDEX_PATH = os.path.join(SHARD_DIR, 'index.json')
+# Not public/stores-data.json: that file was exported from the spreadsheet with an 'SEO Description' column
+# the CSV lacks, and the site reads it, so it is never overwritten from here
+MONOLITH_PATH = os.path.join('public', 'stores-all.json')
+
+def encode_shard(stores):
+    """Minified UTF-8 JSON array of store rows keyed by CSV column names"""
+    rows = [store_to_row(store) for store in stores]
+    return json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def write_atomic(path, data):
+    """Write bytes to path via a temporary file so readers never see a partial shard"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def load_index(path=INDEX_PATH):
+    """Return {shard path: sha256} from the last index, or {}"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    return {entry['path']: entry['sha256'] for entry in index['shards']}
+
+def remove_stale_shards(shard_dir, keep):
+    """Delete .json shards under shard_dir that are no longer in the index, and any emptied directories"""
+    for root, dirs, names in os.walk(shard_dir, topdown=False):
+        for name in names:
+            path = os.path.join(root, name)
+            rel_path = os.path.relpath(path, shard_dir).replace(os.sep, '/')
+            if name.endswith('.json') and rel_path not in keep:
+                os.remove(path)
+        for name in dirs:
+            path = os.path.join(root, name)
+            if not os.listdir(path):
+                os.rmdir(path)
+
+def write_store_shards(stores, slugs=None, per_city=False, shard_dir=SHARD_DIR):
+    """Write one shard per state (plus one per city with per_city) and the index
+
+    Shard paths in the index are relative to shard_dir: "texas.json" and,
+    with per_city, "texas/austin.json". Returns (shards written, shards unchanged).
+    """
+    if slugs is None:
+        slugs = SlugRegistry(group_cities_by_state(stores))
+    index_path = os.path.join(shard_dir, 'index.json')
+    previous = load_index(index_path)
+
+    stores_by_state = defaultdict(list)
+    for store in stores:
+        stores_by_state[store.state].append(store)
+
+    # State shards first, each followed by its city shards
+    shards = []
+    for state in sorted(stores_by_state):
+        state_stores = stores_by_state[state]
+        state_slug = slugs.state_slug(state)
+        shards.append((state, None, f"{state_slug}.json", state_stores))
+        if per_city:
+            stores_by_city = defaultdict(list)
+            for store in state_stores:
+                stores_by_city[store.city].append(store)
+            for city in sorted(stores_by_city):
+                shards.append((state, city, f"{state_slug}/{slugs.city_slug(state, city)}.json", stores_by_city[city]))
+
+    entries = []
+    written = unchanged = 0
+    for state, city, rel_path, shard_stores in shards:
+        data = encode_shard(shard_stores)
+        digest = hashlib.sha256(data).hexdigest()
+        path = os.path.join(shard_dir, rel_path)
+
+        # Unchanged shards keep their mtime, so lastmod and precompression skip them
+        if digest == previous.get(rel_path) and os.path.exists(path):
+            unchanged += 1
+        else:
+            write_atomic(path, data)
+            written += 1
+        entries.append({
+            'state': state,
+            'city': city,
+            'path': rel_path,
+            'count': len(shard_stores),
+            'bytes': len(data),
+            'sha256': digest
+        })
+
+    index = {
+        'total_stores': len(stores),
+        'shards': entries
+    }
+    write_atomic(index_path, json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    remove_stale_shards(shard_dir, {entry['path'] for entry in entries} | {'index.json'})
+
+    return written, unchanged
+
+def write_monolith(stores, path=MONOLITH_PATH):
+    """Write every store to one pretty-printed array of rows keyed by the CSV's column names"""
+    rows = [store_to_row(store) for store in stores]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(rows, f, indent=2, ensure_ascii=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Write per-state JSON shards of the store dataset")
+    parser.add_argument('--per-city', action='store_true',
+                        help="also write one shard per city under each state's directory")
+    parser.add_argument('--monolith', action='store_true',
+                        help=f"also write every store to {MONOLITH_PATH}")
+    args = parser.parse_args()
+
+    stores = load_stores()
+    written, unchanged = write_store_shards(stores, per_city=args.per_city)
+    print(f"Wrote {written} store shards, {unchanged} unchanged, index at {INDEX_PATH}")
+
+    if args.monolith:
+        write_monolith(stores)
+        print(f"Wrote {len(stores)} stores to {MONOLITH_PATH}")
+
+if __name__ == '__main__':
+    main()
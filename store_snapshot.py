@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Columnar binary snapshot of the store dataset
+Fixed-width columns, a deduplicated string table and per-state/per-city row tables,
+read through mmap so one state's stores can be loaded without parsing the whole file
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+from build_manifest import file_digest
+from store_data import CACHE_DIR, CSV_PATH, Store, load_stores
+
+SNAPSHOT_PATH = os.path.join(CACHE_DIR, 'stores.snapshot')
+
+SNAPSHOT_MAGIC = b'CSNP'
+SNAPSHOT_VERSION = 1
+
+# String-id columns, in Store field order
+STRING_COLUMNS = ['name', 'address', 'city', 'state', 'phone', 'website', 'photo', 'pricing']
+
+# magic, version, stores, strings, states, cities, source sha256, then section offsets
+HEADER = struct.Struct('<4sIIIII32s' + 'Q' * 7)
+
+# State: name id, first row, row count, first city, city count
+STATE_ENTRY = struct.Struct('<IIIII')
+
+# City: name id, state index, first position in the city row list, row count
+CITY_ENTRY = struct.Struct('<IIII')
+
+class SnapshotError(ValueError):
+    """Raised for files that aren't snapshots or were written by another version"""
+
+def _section(parts, data):
+    """Append data at an 8-byte aligned offset and return that offset"""
+    offset = sum(len(part) for part in parts)
+    padding = -offset % 8
+    if padding:
+        parts.append(b'\0' * padding)
+        offset += padding
+    parts.append(data)
+    return offset
+
+def write_snapshot(stores, path=SNAPSHOT_PATH, source_digest=b''):
+    """Write stores to a snapshot file
+
+    Rows are grouped by state (states sorted by name) and keep their CSV
+    order within each state, so a state is one contiguous row range. Each
+    city lists its row numbers, also in CSV order.
+    """
+    by_state = {}
+    for store in stores:
+        by_state.setdefault(store.state, []).append(store)
+
+    strings = {}
+    def string_id(text):
+        return strings.setdefault(text, len(strings))
+
+    columns = {name: array('I') for name in STRING_COLUMNS}
+    reviews = array('i')
+    masks = array('H')
+    state_table = []
+    city_table = []
+    city_rows = array('I')
+
+    for state in sorted(by_state):
+        state_stores = by_state[state]
+        first_row = len(reviews)
+        rows_by_city = {}
+        for row, store in enumerate(state_stores, first_row):
+            for name in STRING_COLUMNS:
+                columns[name].append(string_id(getattr(store, name)))
+            reviews.append(store.reviews)
+            masks.append(store.feature_mask)
+            rows_by_city.setdefault(store.city, []).append(row)
+
+        state_index = len(state_table)
+        first_city = len(city_table)
+        for city in sorted(rows_by_city):
+            rows = rows_by_city[city]
+            city_table.append(CITY_ENTRY.pack(string_id(city), state_index, len(city_rows), len(rows)))
+            city_rows.extend(rows)
+        state_table.append(STATE_ENTRY.pack(string_id(state), first_row, len(state_stores), first_city, len(rows_by_city)))
+
+    encoded = [text.encode('utf-8') for text in strings]
+    string_offsets = array('Q', [0])
+    for data in encoded:
+        string_offsets.append(string_offsets[-1] + len(data))
+
+    if sys.byteorder != 'little':
+        for column in [*columns.values(), reviews, masks, city_rows, string_offsets]:
+            column.byteswap()
+
+    parts = [b'\0' * HEADER.size]
+    offsets = [
+        _section(parts, b''.join(columns[name].tobytes() for name in STRING_COLUMNS)),
+        _section(parts, reviews.tobytes()),
+        _section(parts, masks.tobytes()),
+        _section(parts, b''.join(state_table)),
+        _section(parts, b''.join(city_table) + city_rows.tobytes()),
+        _section(parts, string_offsets.tobytes()),
+        _section(parts, b''.join(encoded))
+    ]
+    parts[0] = HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(reviews), len(strings),
+                           len(state_table), len(city_table), source_digest.ljust(32, b'\0'), *offsets)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.writelines(parts)
+    os.replace(tmp_path, path)
+    return path
+
+class StoreSnapshot:
+    """Read-only mmap view of a snapshot
+
+    Columns are memoryviews straight over the mapped file; only the rows and
+    strings a caller asks for are decoded.
+    """
+
+    def __init__(self, path=SNAPSHOT_PATH):
+        if sys.byteorder != 'little':
+            raise SnapshotError("StoreSnapshot reads little-endian column views and needs a little-endian host")
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < HEADER.size:
+            raise SnapshotError(f"{path}: not a store snapshot")
+
+        (magic, version, self.store_count, string_count, state_count, city_count,
+         self.source_digest, *offsets) = HEADER.unpack_from(self._mmap)
+        if magic != SNAPSHOT_MAGIC:
+            raise SnapshotError(f"{path}: not a store snapshot")
+        if version != SNAPSHOT_VERSION:
+            raise SnapshotError(f"{path}: snapshot version {version}, expected {SNAPSHOT_VERSION}")
+
+        view = memoryview(self._mmap)
+        n = self.store_count
+        columns_at, reviews_at, masks_at, states_at, cities_at, string_offsets_at, strings_at = offsets
+
+        self.columns = {}
+        for i, name in enumerate(STRING_COLUMNS):
+            start = columns_at + i * n * 4
+            self.columns[name] = view[start:start + n * 4].cast('I')
+        self.columns['reviews'] = view[reviews_at:reviews_at + n * 4].cast('i')
+        self.columns['feature_mask'] = view[masks_at:masks_at + n * 2].cast('H')
+
+        self._string_offsets = view[string_offsets_at:string_offsets_at + (string_count + 1) * 8].cast('Q')
+        self._strings_at = strings_at
+        self._states_at = states_at
+        self._state_count = state_count
+        self._cities_at = cities_at
+        self._city_count = city_count
+        rows_at = cities_at + city_count * CITY_ENTRY.size
+        self._city_rows = view[rows_at:rows_at + n * 4].cast('I')
+        self._state_index = None
+
+    def close(self):
+        """Release the column views and unmap the file"""
+        for column in self.columns.values():
+            column.release()
+        self._string_offsets.release()
+        self._city_rows.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.store_count
+
+    def string(self, string_id):
+        """Decode one entry of the string table"""
+        start = self._strings_at + self._string_offsets[string_id]
+        end = self._strings_at + self._string_offsets[string_id + 1]
+        return self._mmap[start:end].decode('utf-8')
+
+    def _state_entry(self, index):
+        return STATE_ENTRY.unpack_from(self._mmap, self._states_at + index * STATE_ENTRY.size)
+
+    def _city_entry(self, index):
+        return CITY_ENTRY.unpack_from(self._mmap, self._cities_at + index * CITY_ENTRY.size)
+
+    def _states(self):
+        """State name -> table entry, decoded once per snapshot"""
+        if self._state_index is None:
+            self._state_index = {}
+            for i in range(self._state_count):
+                entry = self._state_entry(i)
+                self._state_index[self.string(entry[0])] = entry
+        return self._state_index
+
+    def state_names(self):
+        """Every state, sorted"""
+        return list(self._states())
+
+    def state_row_range(self, state):
+        """(first row, row count) of a state's contiguous rows"""
+        _, first_row, row_count, _, _ = self._states()[state]
+        return first_row, row_count
+
+    def city_rows(self, state):
+        """City name -> list of row numbers for one state's cities
+
+        The rows are copied out of the mapped file, so callers can keep them
+        after the snapshot is closed.
+        """
+        _, _, _, first_city, city_count = self._states()[state]
+        cities = {}
+        for i in range(first_city, first_city + city_count):
+            name_id, _, start, count = self._city_entry(i)
+            cities[self.string(name_id)] = self._city_rows[start:start + count].tolist()
+        return cities
+
+    def store(self, row):
+        """Decode one row into a Store"""
+        columns = self.columns
+        strings = [self.string(columns[name][row]) for name in STRING_COLUMNS]
+        name, address, city, state, phone, website, photo, pricing = strings
+        return Store(name, address, sys.intern(city), sys.intern(state), phone, website,
+                     columns['reviews'][row], photo, sys.intern(pricing), columns['feature_mask'][row])
+
+    def state_stores(self, state):
+        """Every store in a state, in CSV order"""
+        first_row, row_count = self.state_row_range(state)
+        return [self.store(row) for row in range(first_row, first_row + row_count)]
+
+    def city_stores(self, state, city):
+        """Every store in one city, in CSV order"""
+        return [self.store(row) for row in self.city_rows(state)[city]]
+
+    def stores(self):
+        """Every store, grouped by state"""
+        return [self.store(row) for row in range(self.store_count)]
+
+def build_snapshot(csv_path=CSV_PATH, path=SNAPSHOT_PATH):
+    """Write a snapshot of csv_path, tagged with the CSV's SHA-256"""
+    return write_snapshot(load_stores(csv_path), path, bytes.fromhex(file_digest(csv_path)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the store snapshot and time reading one state from it")
+    parser.add_argument('--csv', default=CSV_PATH, help=f"source CSV (default: {CSV_PATH})")
+    parser.add_argument('--output', default=SNAPSHOT_PATH, help=f"snapshot path (default: {SNAPSHOT_PATH})")
+    parser.add_argument('--state', default='Texas', help="state to read back (default: Texas)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    build_snapshot(args.csv, args.output)
+    write_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with StoreSnapshot(args.output) as snapshot:
+        state_stores = snapshot.state_stores(args.state)
+    read_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parsed = [store for store in load_stores(args.csv, use_cache=False) if store.state == args.state]
+    parse_time = time.perf_counter() - start
+    assert state_stores == parsed
+
+    print(f"Wrote {args.output} ({os.path.getsize(args.output):,} bytes) in {write_time * 1000:.1f} ms")
+    print(f"{args.state}: {len(state_stores)} stores")
+    print(f"  Snapshot (mmap, one state): {read_time * 1000:.2f} ms")
+    print(f"  CSV parse (whole file):     {parse_time * 1000:.2f} ms")
+
+if __name__ == '__main__':
+    main()
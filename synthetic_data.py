@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Seeded synthetic store data shaped like consignment_stores.csv
+Used to measure how the generators scale past the real dataset
+"""
+
+import argparse
+import csv
+import random
+
+from store_data import ATTRIBUTE_COLUMNS
+
+CSV_COLUMNS = [
+    'Business Name', 'Address', 'City', 'State', 'Number of Reviews',
+    'Site', 'Phone', 'Photo'
+] + ATTRIBUTE_COLUMNS
+
+STATE_CODES = {
+    'Alabama': 'AL', 'Alaska': 'AK', 'Arizona': 'AZ', 'Arkansas': 'AR', 'California': 'CA',
+    'Colorado': 'CO', 'Connecticut': 'CT', 'Delaware': 'DE', 'District of Columbia': 'DC',
+    'Florida': 'FL', 'Georgia': 'GA', 'Hawaii': 'HI', 'Idaho': 'ID', 'Illinois': 'IL',
+    'Indiana': 'IN', 'Iowa': 'IA', 'Kansas': 'KS', 'Kentucky': 'KY', 'Louisiana': 'LA',
+    'Maine': 'ME', 'Maryland': 'MD', 'Massachusetts': 'MA', 'Michigan': 'MI', 'Minnesota': 'MN',
+    'Mississippi': 'MS', 'Missouri': 'MO', 'Montana': 'MT', 'Nebraska': 'NE', 'Nevada': 'NV',
+    'New Hampshire': 'NH', 'New Jersey': 'NJ', 'New Mexico': 'NM', 'New York': 'NY',
+    'North Carolina': 'NC', 'North Dakota': 'ND', 'Ohio': 'OH', 'Oklahoma': 'OK', 'Oregon': 'OR',
+    'Pennsylvania': 'PA', 'Rhode Island': 'RI', 'South Carolina': 'SC', 'South Dakota': 'SD',
+    'Tennessee': 'TN', 'Texas': 'TX', 'Utah': 'UT', 'Vermont': 'VT', 'Virginia': 'VA',
+    'Washington': 'WA', 'West Virginia': 'WV', 'Wisconsin': 'WI', 'Wyoming': 'WY'
+}
+
+NAME_WORDS = [
+    'Second', 'Chance', 'Treasure', 'Trove', 'Vintage', 'Closet', 'Encore', 'Again',
+    'Resale', 'Thrift', 'Market', 'Boutique', 'Attic', 'Finds', 'Hidden', 'Gem'
+]
+
+STREET_NAMES = ['Main St', 'Oak Ave', 'Maple Dr', 'Broadway', 'Elm St', 'Park Blvd', 'Lake Rd', '1st St']
+
+PRICING_TIERS = ['Low', 'Low', 'Mid-Range', 'Mid-Range', 'Mid-Range', 'High']
+
+def build_geography(rng, cities_per_state):
+    """Assign each state a Zipf-weighted list of synthetic cities"""
+    states = sorted(STATE_CODES.items())
+    rng.shuffle(states)
+
+    geography = []
+    for rank, (state, code) in enumerate(states, 1):
+        state_weight = 1 / rank ** 0.8
+        zip_base = 10000 + rank * 1500
+        cities = []
+        for city_rank in range(1, cities_per_state + 1):
+            city = f"{rng.choice(NAME_WORDS)} {rng.choice(['Springs', 'Falls', 'City', 'Heights', 'Valley', 'Park'])} {city_rank}"
+            cities.append((city, zip_base + city_rank, 1 / city_rank ** 1.1))
+        geography.append((state, code, state_weight, cities))
+    return geography
+
+def generate_rows(n_stores, seed=42, cities_per_state=400):
+    """Yield n_stores CSV rows with skewed state and city sizes"""
+    rng = random.Random(seed)
+    geography = build_geography(rng, cities_per_state)
+    state_weights = [weight for _, _, weight, _ in geography]
+    city_weights = {state: [weight for _, _, weight in cities] for state, _, _, cities in geography}
+
+    for i in range(n_stores):
+        state, code, _, cities = rng.choices(geography, weights=state_weights)[0]
+        city, zip_code, _ = rng.choices(cities, weights=city_weights[state])[0]
+        name = f"{rng.choice(NAME_WORDS)} {rng.choice(NAME_WORDS)} {i}"
+        row = {
+            'Business Name': name,
+            'Address': f"{rng.randint(1, 9999)} {rng.choice(STREET_NAMES)}, {city}, {code} {zip_code:05d}",
+            'City': city,
+            'State': state,
+            'Number of Reviews': int(rng.paretovariate(1.2) * 10),
+            'Site': f"https://www.store{i}.example.com/" if rng.random() < 0.7 else '',
+            'Phone': f"+1 {rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(0, 9999):04d}",
+            'Photo': f"https://images.example.com/{i}.jpg" if rng.random() < 0.8 else '',
+            'pricing': rng.choice(PRICING_TIERS)
+        }
+        for col in ATTRIBUTE_COLUMNS[1:]:
+            row[col] = 'Yes' if rng.random() < 0.45 else 'No'
+        yield row
+
+def write_synthetic_csv(path, n_stores, seed=42):
+    """Write a consignment_stores.csv-shaped file with n_stores rows"""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        writer.writerows(generate_rows(n_stores, seed))
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic consignment_stores.csv-shaped file")
+    parser.add_argument('path', help="output CSV path")
+    parser.add_argument('--stores', type=int, default=10000, help="number of store rows (default: 10000)")
+    parser.add_argument('--seed', type=int, default=42, help="random seed (default: 42)")
+    args = parser.parse_args()
+
+    write_synthetic_csv(args.path, args.stores, args.seed)
+    print(f"Wrote {args.stores:,} synthetic stores to {args.path}")
+
+if __name__ == '__main__':
+    main()
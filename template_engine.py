@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Precompiled {{PLACEHOLDER}} templates for the templates/ directory
+Each template is split once into literal segments and slot positions, then rendered with a single join
+"""
+
+import re
+import time
+
+PLACEHOLDER_RE = re.compile(r'\{\{([A-Z0-9_]+)\}\}')
+
+class TemplateError(ValueError):
+    """Raised when a template's placeholders don't match the slots its renderer fills"""
+
+def compile_template(text, slots, name='template'):
+    """Compile template text into (segments, positions) for render_template
+
+    segments alternates literal text with None placeholders; positions lists
+    (index, slot name) for every placeholder. Placeholders that the renderer
+    doesn't know about, and declared slots that never appear, raise
+    TemplateError here instead of leaking into the generated pages.
+    """
+    slots = set(slots)
+    segments = []
+    positions = []
+    found = set()
+    last = 0
+
+    for match in PLACEHOLDER_RE.finditer(text):
+        segments.append(text[last:match.start()])
+        positions.append((len(segments), match.group(1)))
+        segments.append(None)
+        found.add(match.group(1))
+        last = match.end()
+    segments.append(text[last:])
+
+    unknown = sorted(found - slots)
+    unfilled = sorted(slots - found)
+    if unknown or unfilled:
+        problems = []
+        if unknown:
+            problems.append(f"unknown placeholders {', '.join(unknown)}")
+        if unfilled:
+            problems.append(f"slots never used {', '.join(unfilled)}")
+        raise TemplateError(f"{name}: {'; '.join(problems)}")
+
+    return segments, positions
+
+def load_template(path, slots):
+    """Read and compile a template file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return compile_template(f.read(), slots, name=path)
+
+def render_template(compiled, values):
+    """Fill every slot from values (a name -> str mapping) in one join"""
+    segments, positions = compiled
+    parts = segments[:]
+    for index, name in positions:
+        parts[index] = values[name]
+    return ''.join(parts)
+
+def render_with_replace(text, values):
+    """The previous chained str.replace rendering, kept for benchmarking"""
+    for name, value in values.items():
+        text = text.replace('{{' + name + '}}', value)
+    return text
+
+def main():
+    """Benchmark the compiled city template against the str.replace chain"""
+    path = 'templates/city-template.html'
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    slots = sorted(set(PLACEHOLDER_RE.findall(text)))
+    values = {name: f"value for {name.lower()}" for name in slots}
+    values['STORE_LISTINGS'] = '<div class="store-card">Sample store</div>\n' * 40
+
+    start = time.perf_counter()
+    compiled = compile_template(text, slots, name=path)
+    compile_time = time.perf_counter() - start
+
+    assert render_template(compiled, values) == render_with_replace(text, values)
+
+    iterations = 2000
+    start = time.perf_counter()
+    for _ in range(iterations):
+        render_with_replace(text, values)
+    replace_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        render_template(compiled, values)
+    compiled_time = time.perf_counter() - start
+
+    print(f"{path}: {len(text):,} bytes, {len(compiled[1])} placeholders, {len(slots)} slots")
+    print(f"  Compile once:      {compile_time * 1000:.3f} ms")
+    print(f"  str.replace chain: {replace_time / iterations * 1e6:.1f} us/page")
+    print(f"  Compiled render:   {compiled_time / iterations * 1e6:.1f} us/page")
+    print(f"  Speedup:           {replace_time / compiled_time:.1f}x")
+
+if __name__ == '__main__':
+    main()